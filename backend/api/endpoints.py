@@ -1,12 +1,14 @@
-import os
-
 from fastapi import APIRouter, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from api.models import TherapistResponse
+from chatbot.uploads import UnsupportedUpload, UploadTooLarge, get_upload_store
 
 
 router = APIRouter()
+impression_store = get_upload_store()
 
 
 @router.get("/therapist/response")
@@ -17,17 +19,20 @@ async def therapist_response(response: TherapistResponse):
 @router.post("/user/impression")
 async def user_first_impression(image: UploadFile):
     try:
-        save_dir = "./data/user/first_impression"
-        os.makedirs(save_dir, exist_ok=True)
-
-        filename = f"image_{len(os.listdir(save_dir)) + 1}.jpg"
-        file_path = os.path.join(save_dir, filename)
-
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
-
-        return {"message": "File saved successfully", "file_path": file_path}
-
+        # Starlette has spooled the part to a temp file; the store copies it in chunks off the event loop.
+        stored = await run_in_threadpool(impression_store.save, image.file)
+
+        return {
+            "message": "File saved successfully",
+            "file_path": stored["path"],
+            "digest": stored["digest"],
+            "duplicate": stored["duplicate"]
+        }
+
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except UnsupportedUpload as e:
+        return JSONResponse({"error": str(e)}, status_code=415)
     except Exception as e:
         return {"message": str(e)}
 
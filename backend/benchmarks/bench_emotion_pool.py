@@ -0,0 +1,77 @@
+"""
+Face-analysis throughput and latency percentiles through EmotionWorkerPool for
+different worker counts, on whatever CPU this runs on.
+
+    cd backend && python -m benchmarks.bench_emotion_pool --workers 1 4 --requests 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from chatbot.speach.emotion import synthetic_face
+from chatbot.speach.emotion_pool import EmotionWorkerPool
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def run(pool: EmotionWorkerPool, images, concurrency: int):
+    latencies = []
+    errors = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(image):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await pool.analyze(image)
+            except ValueError as e:
+                # Noisy synthetic faces are sometimes not detected; that still cost a full analysis.
+                errors.append(str(e))
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(image) for image in images))
+    return len(images) / (time.perf_counter() - start), latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = synthetic_face()
+    images = [
+        np.clip(base.astype(np.int16) + rng.integers(-8, 8, base.shape), 0, 255).astype(np.uint8)
+        for _ in range(args.requests)
+    ]
+
+    print(f"{'workers':>8} {'load s':>8} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'errors':>7}")
+    for workers in args.workers:
+        pool = EmotionWorkerPool(workers=workers, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+        pool.start()
+        try:
+            throughput, latencies, errors = asyncio.run(run(pool, images, args.concurrency))
+        finally:
+            status = pool.status()
+            pool.close()
+
+        print(f"{workers:>8} {status['load_seconds']:>8.1f} {throughput:>8.1f} "
+              f"{statistics.median(latencies) * 1000:>8.0f} {percentile(latencies, 99) * 1000:>8.0f} "
+              f"{status['mean_batch_size']:>6.1f} {len(errors):>7}")
+        if errors:
+            print(f"{'':>8} first error: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
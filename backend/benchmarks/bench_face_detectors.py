@@ -0,0 +1,209 @@
+"""
+Accuracy against latency of each DeepFace detector backend, with and without
+the FacePreprocessor stages, on a fixture image set.
+
+    cd backend && python -m benchmarks.bench_face_detectors --real-deepface --output detectors.json
+    cd backend && python -m benchmarks.bench_face_detectors --real-deepface --images ~/fer-sample
+
+Preprocessing modes:
+
+    raw        the decoded image as uploaded (the old behaviour)
+    downscale  longer side capped at --max-side
+    crop       downscale, plus cropping to the face found in the previous image of the same sequence
+
+``--images`` takes a directory of photos, labelled by their parent directory
+when it is an emotion name (``happy/001.jpg``). Without it, synthetic faces
+are rendered into phone-sized frames at each ``--resolutions``, drifting a
+little from frame to frame like a webcam sequence. Unlabelled images are
+scored against the ``--reference`` backend on raw input, so "agree" is how
+often a cheaper configuration reaches the same dominant emotion. Synthetic
+faces carry no expression, so without ``--images`` only detection rate and
+latency are reported.
+
+Without --real-deepface the analyzer is the offline fake, whose cost scales
+with input pixels: that measures the preprocessing stages only.
+"""
+import argparse
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmotionAnalyzer
+from benchmarks.stages import StageTimer, build_report, print_summary, write_report
+from chatbot.speach.emotion import synthetic_face
+from chatbot.speach.face_preprocess import DETECTOR_BACKENDS, FacePreprocessor
+
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+MODES = ("raw", "downscale", "crop")
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# (path, label or None, sequence the image belongs to: its resolution or directory)
+Fixture = Tuple[str, Optional[str], str]
+
+
+def render_frames(directory: str, resolution: str, frames: int, rng: np.random.Generator) -> List[Fixture]:
+    import cv2
+
+    width, height = (int(side) for side in resolution.split("x"))
+    face_side = height // 3
+    face = cv2.resize(synthetic_face(), (face_side, face_side), interpolation=cv2.INTER_CUBIC)
+    x, y = (width - face_side) // 2, (height - face_side) // 2
+    fixtures = []
+    for i in range(frames):
+        # Smooth clutter rather than per-pixel noise, which no camera JPEG looks like.
+        clutter = rng.integers(40, 200, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+        frame = cv2.resize(clutter, (width, height), interpolation=cv2.INTER_LINEAR)
+        x = int(np.clip(x + rng.integers(-face_side // 20, face_side // 20 + 1), 0, width - face_side))
+        y = int(np.clip(y + rng.integers(-face_side // 20, face_side // 20 + 1), 0, height - face_side))
+        frame[y:y + face_side, x:x + face_side] = face
+        path = os.path.join(directory, f"{resolution}-{i:03d}.jpg")
+        cv2.imwrite(path, frame)
+        fixtures.append((path, None, resolution))
+    return fixtures
+
+
+def load_fixtures(directory: str) -> List[Fixture]:
+    fixtures = []
+    for root, _, files in sorted(os.walk(directory)):
+        label = os.path.basename(root).lower()
+        sequence = os.path.relpath(root, directory)
+        for name in sorted(files):
+            if name.lower().endswith(_IMAGE_EXTENSIONS):
+                fixtures.append((os.path.join(root, name), label if label in EMOTIONS else None, sequence))
+    return fixtures
+
+
+def build_analyzer(backend: str, args):
+    if not args.real_deepface:
+        return FakeEmotionAnalyzer(args.face_latency, args.seconds_per_megapixel)
+
+    from chatbot.speach.emotion import EmotionAnalyzer
+
+    analyzer = EmotionAnalyzer(detector_backend=backend)
+    analyzer.load()
+    return analyzer
+
+
+def build_preprocessor(mode: str, args) -> FacePreprocessor:
+    max_side = 0 if mode == "raw" else args.max_side
+    return FacePreprocessor(max_side=max_side, crop_margin=args.crop_margin, reuse_region=mode == "crop")
+
+
+def run_config(analyzer, preprocessor: FacePreprocessor, fixtures: List[Fixture],
+               timer: StageTimer, name: str) -> List[Optional[Dict]]:
+    timer.wrap(preprocessor, "prepare", f"{name} > preprocess")
+
+    def analyze(image):
+        # Not timer.wrap: the analyzer is shared by every mode of its backend.
+        with timer.stage(f"{name} > analyze"):
+            return analyzer.analyze(image)
+
+    results = []
+    for path, _, sequence in fixtures:
+        with timer.stage(name), timer.stage(f"{name} @ {sequence}"):
+            try:
+                result = preprocessor.analyze(analyze, path, session_id=sequence)[0]
+            except ValueError:
+                # enforce_detection: no face found
+                result = None
+        results.append(result)
+    return results
+
+
+def score(results: List[Optional[Dict]], fixtures: List[Fixture],
+          reference: Optional[List[Optional[Dict]]]) -> Dict[str, float]:
+    detected = agree = scored = 0
+    for i, (result, (_, label, _)) in enumerate(zip(results, fixtures)):
+        # The skip detector hands DeepFace the whole image and reports confidence 0.
+        if result is not None and result.get("face_confidence", 1) > 0:
+            detected += 1
+        if label is None and reference is not None and reference[i] is not None:
+            label = reference[i]["dominant_emotion"]
+        if label is not None:
+            scored += 1
+            agree += result is not None and result["dominant_emotion"] == label
+    return {
+        "images": len(fixtures),
+        "detected": detected / len(fixtures),
+        "agree": agree / scored if scored else None,
+        "scored": scored
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", choices=DETECTOR_BACKENDS, default=list(DETECTOR_BACKENDS))
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--reference", choices=DETECTOR_BACKENDS, default="retinaface",
+                        help="backend whose raw-input results score unlabelled images")
+    parser.add_argument("--images", help="directory of fixture images, optionally in <emotion>/ subdirectories")
+    parser.add_argument("--resolutions", nargs="+", default=["640x480", "1920x1080", "4032x3024"])
+    parser.add_argument("--frames", type=int, default=10, help="rendered frames per resolution")
+    parser.add_argument("--max-side", type=int, default=640)
+    parser.add_argument("--crop-margin", type=float, default=0.6)
+    parser.add_argument("--real-deepface", action="store_true", help="run DeepFace instead of the fake analyzer")
+    parser.add_argument("--face-latency", type=float, default=0.0, help="fake analyzer: fixed seconds per image")
+    parser.add_argument("--seconds-per-megapixel", type=float, default=0.02,
+                        help="fake analyzer: detection seconds per input megapixel")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    backends = args.backends if args.real_deepface else ["fake"]
+    reference_backend = args.reference if args.real_deepface else "fake"
+    if reference_backend in backends:
+        # Run the reference first so every other configuration can be scored against it.
+        backends = [reference_backend] + [b for b in backends if b != reference_backend]
+
+    with tempfile.TemporaryDirectory(prefix="bench-faces-") as work_dir:
+        if args.images:
+            fixtures = load_fixtures(args.images)
+        else:
+            print("Warning: no --images given, so the faces are synthetic; emotion agreement is not reported "
+                  "because it would not mean anything.")
+            rng = np.random.default_rng(0)
+            fixtures = [f for resolution in args.resolutions for f in render_frames(work_dir, resolution,
+                                                                                    args.frames, rng)]
+        if not fixtures:
+            parser.error(f"no images found in {args.images}")
+
+        suites = {}
+        reference = None
+        for backend in backends:
+            try:
+                analyzer = build_analyzer(backend, args)
+            except Exception as e:
+                # mtcnn and retinaface need their own packages next to deepface.
+                print(f"\n[{backend}] skipped: {e}")
+                continue
+
+            for mode in (["raw"] if backend == reference_backend else []) + args.modes:
+                name = f"{backend}/{mode}"
+                if name in suites:
+                    continue
+                timer = StageTimer()
+                results = run_config(analyzer, build_preprocessor(mode, args), fixtures, timer, name)
+                if backend == reference_backend and mode == "raw":
+                    reference = results
+                accuracy = score(results, fixtures, reference if args.images else None)
+                suites[name] = {"iterations": len(fixtures), "stages": timer.summary(), "accuracy": accuracy}
+                print_summary(name, suites[name]["stages"])
+
+    agree_column = f" {'agree':>7}" if args.images else ""
+    print(f"\n{'config':<24} {'detected':>9}{agree_column} {'mean ms':>9} {'p95 ms':>9}")
+    for name, suite in suites.items():
+        accuracy, total = suite["accuracy"], suite["stages"][name]
+        agree = ""
+        if args.images:
+            agree = f" {accuracy['agree']:.0%}" if accuracy["agree"] is not None else " -"
+            agree = f"{agree:>8}"
+        print(f"{name:<24} {accuracy['detected']:>9.0%}{agree} {total['mean_ms']:>9.1f} {total['p95_ms']:>9.1f}")
+
+    if args.output:
+        write_report(build_report(suites, vars(args)), args.output)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
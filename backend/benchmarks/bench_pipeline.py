@@ -0,0 +1,209 @@
+"""
+Per-stage timings of the text, voice, face-analysis and scraping pipelines
+against the offline fakes in benchmarks.fakes, written as a JSON report that
+benchmarks.compare can diff between commits.
+
+    cd backend && python -m benchmarks.bench_pipeline --iterations 50 --output before.json
+    cd backend && python -m benchmarks.bench_pipeline --iterations 50 --output after.json
+    cd backend && python -m benchmarks.compare before.json after.json
+
+Upstream latencies default to zero so the numbers show local overhead
+(history I/O, prompt assembly, hashing, serialization); pass --llm-latency
+etc. to model a realistic turn.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Dict
+
+_WORK_DIR = tempfile.mkdtemp(prefix="bench-pipeline-")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("DEEPGRAM_API_KEY", "benchmark")
+os.environ.setdefault("CHAT_HISTORY_PATH", os.path.join(_WORK_DIR, "chat_history.db"))
+os.environ.setdefault("EMOTION_WORKERS", "0")
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.fakes import (FakeChatModel, FakeDDGS, FakeDeepgram, FakeEmotionAnalyzer, HtmlFixtureServer,
+                              fixture_wav)
+from benchmarks.stages import StageTimer, build_report, print_summary, write_report
+
+MESSAGES = [
+    "I feel really anxious lately and I can't sleep at night because of work stress.",
+    "My mother passed away last month and I don't know how to cope with the grief.",
+    "I keep having panic attacks before exams, what can I do?",
+    "I've been feeling lonely since I moved to a new city and I don't have any friends here.",
+    "Sometimes I feel like nothing I do matters and I have no motivation to get out of bed.",
+]
+
+
+def bench_text(args) -> Dict:
+    from chatbot.text.main import TextTherapyService
+
+    service = TextTherapyService()
+    llm = FakeChatModel(args.llm_latency, args.tokens_per_second)
+    service.openai = llm
+    service.summarizer.llm = FakeChatModel(args.llm_latency, args.tokens_per_second)
+    service.ddg = FakeDDGS(args.search_latency)
+
+    timer = StageTimer()
+    timer.wrap(service, "save_to_history", "save_to_history")
+    timer.wrap(service.history, "append", "history_store.append")
+    timer.wrap(service.memory, "add", "memory.add")
+    timer.wrap(service.memory, "relevant", "memory.relevant")
+    timer.wrap(service, "build_search_query", "build_search_query")
+    timer.wrap(service, "search_duckduckgo", "search")
+    timer.wrap(service.ddg, "text", "search.upstream")
+    timer.wrap(service, "_response_messages", "prompt")
+    timer.wrap(llm, "invoke", "llm")
+
+    for i in range(args.iterations):
+        if not args.warm_caches:
+            service.search_cache.clear()
+        message = MESSAGES[i % len(MESSAGES)]
+        with timer.stage("process_message"):
+            result = service.process_message(message, session_id=f"bench-{i % args.sessions}")
+        with timer.stage("serialize"):
+            json.dumps(jsonable_encoder({"result": result["response"]}))
+
+    return {"iterations": args.iterations, "stages": timer.summary()}
+
+
+def _speech_bot(args, timer: StageTimer):
+    if args.tts_cache:
+        os.environ.setdefault("TTS_CACHE_DIR", os.path.join(_WORK_DIR, "tts_cache"))
+    from chatbot.speach.chatbot_client import EmotionAwareBot
+
+    bot = EmotionAwareBot()
+    llm = FakeChatModel(args.llm_latency, args.tokens_per_second)
+    deepgram = FakeDeepgram(args.tts_latency, args.stt_latency)
+    bot.openai = llm
+    bot.summarizer.llm = FakeChatModel(args.llm_latency, args.tokens_per_second)
+    bot.tts.deepgram = deepgram
+    bot.stt.deepgram = deepgram
+    if not args.real_deepface:
+        bot.emotion_analyzer = FakeEmotionAnalyzer(args.face_latency)
+    bot.emotion_analyzer.load()
+
+    timer.wrap(bot.emotion_analyzer, "analyze", "deepface")
+    timer.wrap(bot, "_image_key", "image_key")
+    timer.wrap(bot, "analyze_image", "analyze_image")
+    timer.wrap(bot, "save_to_history", "save_to_history")
+    timer.wrap(bot.history, "append", "history_store.append")
+    timer.wrap(bot, "_query_messages", "prompt")
+    timer.wrap(llm, "invoke", "llm")
+    return bot
+
+
+def _face_image(directory: str) -> str:
+    import cv2
+
+    from chatbot.speach.emotion import synthetic_face
+
+    path = os.path.join(directory, "face.jpg")
+    cv2.imwrite(path, synthetic_face())
+    return path
+
+
+def bench_audio(args) -> Dict:
+    timer = StageTimer()
+    bot = _speech_bot(args, timer)
+    timer.wrap(bot.stt, "transcribe_file", "stt")
+    timer.wrap(bot.tts, "speak", "tts")
+
+    audio_path = os.path.join(_WORK_DIR, "query.wav")
+    with open(audio_path, "wb") as f:
+        f.write(fixture_wav(3.0))
+    image_path = _face_image(_WORK_DIR) if args.with_image else None
+
+    for i in range(args.iterations):
+        if not args.warm_caches:
+            bot.face_cache.clear()
+        with timer.stage("process_audio_file"):
+            result = bot.process_audio_file(audio_path, image_path, session_id=f"bench-{i % args.sessions}")
+        with timer.stage("serialize"):
+            json.dumps(jsonable_encoder({k: v for k, v in result.items() if k != "audio_response"}))
+        if bot.tts.cache is None and result.get("audio_response"):
+            os.remove(result["audio_response"])
+
+    return {"iterations": args.iterations, "stages": timer.summary()}
+
+
+def bench_face(args) -> Dict:
+    timer = StageTimer()
+    bot = _speech_bot(args, timer)
+    image_path = _face_image(_WORK_DIR)
+
+    for _ in range(args.iterations):
+        if not args.warm_caches:
+            bot.face_cache.clear()
+        analysis = bot.analyze_image(image_path)
+        with timer.stage("serialize"):
+            json.dumps({"result": str(analysis)})
+
+    return {"iterations": args.iterations, "stages": timer.summary()}
+
+
+def bench_scrape(args) -> Dict:
+    # WebScraper lives in the standalone prototype next to backend/.
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot"))
+    import scraper
+
+    timer = StageTimer()
+    timer.wrap(scraper, "extract_text", "extract_text")
+
+    with HtmlFixtureServer(latency=args.scrape_latency) as server:
+        web_scraper = scraper.WebScraper()
+        timer.wrap(web_scraper, "_read_body", "read_body")
+        timer.wrap(web_scraper, "scrape_content", "scrape_content")
+        for i in range(args.iterations):
+            if not args.warm_caches:
+                web_scraper.cache.clear()
+            with timer.stage("scrape_many"):
+                web_scraper.scrape_many([server.url(i * 3 + n) for n in range(3)])
+        web_scraper.executor.shutdown()
+
+    return {"iterations": args.iterations, "stages": timer.summary()}
+
+
+SUITES = {
+    "text": bench_text,
+    "audio": bench_audio,
+    "face": bench_face,
+    "scrape": bench_scrape,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suites", nargs="+", choices=sorted(SUITES), default=list(SUITES))
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=5, help="distinct session ids to rotate through")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="0 returns tokens instantly")
+    parser.add_argument("--search-latency", type=float, default=0.0)
+    parser.add_argument("--stt-latency", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.0)
+    parser.add_argument("--face-latency", type=float, default=0.0)
+    parser.add_argument("--scrape-latency", type=float, default=0.0)
+    parser.add_argument("--warm-caches", action="store_true", help="keep search/face/scrape caches between turns")
+    parser.add_argument("--tts-cache", action="store_true", help="enable the TTS disk cache")
+    parser.add_argument("--with-image", action="store_true", help="include face analysis in the audio suite")
+    parser.add_argument("--real-deepface", action="store_true", help="run DeepFace instead of the fake analyzer")
+    args = parser.parse_args()
+
+    suites = {}
+    for name in args.suites:
+        suites[name] = SUITES[name](args)
+        print_summary(name, suites[name]["stages"])
+
+    if args.output:
+        write_report(build_report(suites, vars(args)), args.output)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
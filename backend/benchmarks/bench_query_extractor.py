@@ -0,0 +1,94 @@
+"""
+Per-turn cost of building the DuckDuckGo query locally instead of with the
+gpt-4o-mini summarize_for_search call.
+
+    cd backend && python -m benchmarks.bench_query_extractor
+    cd backend && python -m benchmarks.bench_query_extractor --measure-llm   # needs OPENAI_API_KEY
+
+Without --measure-llm the LLM side of the comparison is an assumption
+(--llm-latency-ms, and tokens estimated from the prompt length), and the
+report says so.
+"""
+import argparse
+import statistics
+import time
+
+from chatbot.search import extract_search_query
+
+MESSAGES = [
+    "I feel really anxious lately and I can't sleep at night because of work stress.",
+    "My mother passed away last month and I don't know how to cope with the grief.",
+    "I keep having panic attacks before exams, what can I do?",
+    "Lately my partner and I argue constantly about money and I feel like our relationship is falling apart, "
+    "I have trouble concentrating at work and my sleep is terrible.",
+    "I've been feeling lonely since I moved to a new city and I don't have any friends here.",
+    "Sometimes I feel like nothing I do matters and I have no motivation to get out of bed.",
+]
+
+# summarize_for_search wraps the message in a ~35 token template plus a short
+# system message and typically returns a ~12 token query.
+PROMPT_OVERHEAD_TOKENS = 45
+COMPLETION_TOKENS = 12
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def measure_llm(rounds: int):
+    """Median latency and mean total tokens of the real summarize_for_search call."""
+    from chatbot.clients import clients
+    from chatbot.text.main import TextTherapyService
+
+    llm = clients.chat_model("gpt-4o-mini")
+    latencies, tokens = [], []
+    for _ in range(rounds):
+        for message in MESSAGES:
+            start = time.perf_counter()
+            response = llm.invoke(TextTherapyService._summary_messages(message, 100))
+            latencies.append((time.perf_counter() - start) * 1000)
+            usage = getattr(response, "usage_metadata", None) or {}
+            if usage.get("total_tokens"):
+                tokens.append(usage["total_tokens"])
+    return statistics.median(latencies), statistics.mean(tokens) if tokens else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--llm-latency-ms", type=float, default=450.0,
+                        help="assumed p50 of a gpt-4o-mini summarize call when not measuring it")
+    parser.add_argument("--measure-llm", action="store_true",
+                        help="time the real summarize_for_search LLM call instead of assuming --llm-latency-ms")
+    parser.add_argument("--llm-rounds", type=int, default=3, help="passes over the sample messages with --measure-llm")
+    args = parser.parse_args()
+
+    for message in MESSAGES:
+        print(f"{extract_search_query(message)!r}")
+
+    extract_search_query.cache_clear()
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        # Vary the text so the memo does not hide the extraction cost.
+        extract_search_query(f"{MESSAGES[i % len(MESSAGES)]} {i}")
+    cold_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        extract_search_query(MESSAGES[i % len(MESSAGES)])
+    memo_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+    llm_ms, tokens = measure_llm(args.llm_rounds) if args.measure_llm else (args.llm_latency_ms, None)
+    latency_source = "measured p50" if args.measure_llm else "assumed, pass --measure-llm to time it"
+    token_source = "measured"
+    if tokens is None:
+        tokens = sum(estimate_tokens(m) + PROMPT_OVERHEAD_TOKENS + COMPLETION_TOKENS for m in MESSAGES) / len(MESSAGES)
+        token_source = "estimated"
+
+    print(f"\nlocal extraction: {cold_us:.1f} us/turn (memo hit {memo_us:.2f} us)")
+    print(f"LLM query call:   {llm_ms:.0f} ms ({latency_source}), ~{tokens:.0f} tokens ({token_source})")
+    print(f"saved per turn:   ~{llm_ms - cold_us / 1000:.0f} ms, ~{tokens:.0f} tokens")
+
+
+if __name__ == "__main__":
+    main()
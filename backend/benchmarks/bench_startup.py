@@ -0,0 +1,185 @@
+"""
+Cold-start cost of the FastAPI apps: an ``-X importtime`` breakdown of the
+heaviest top-level imports, plus time to first 200 and time until the
+warm-up task has built the heavy subsystems. Each run is a fresh Python
+process, so nothing is cached in memory between runs. The report has the
+bench_pipeline format, so benchmarks.compare tracks it across commits.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5 --output startup.json
+
+The child drives the ASGI app in-process (startup events, then requests
+through httpx.ASGITransport) rather than starting uvicorn, so the numbers
+leave out server boot, which is constant.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.stages import StageTimer, build_report, print_summary, write_report
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    "text": {"target": "main:app", "probe": "/metrics", "ready": "/text-service/stats"},
+    "speech": {"target": "chatbot.speach.endpoints:router", "probe": "/metrics", "ready": "/health"},
+}
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def _child_env(work_dir: str, warm_up: bool) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("DEEPGRAM_API_KEY", "benchmark")
+    env["CHAT_HISTORY_PATH"] = os.path.join(work_dir, "chat_history.db")
+    env["HTTP_PREWARM"] = "0"
+    env["WARMUP_ON_STARTUP"] = "1" if warm_up else "0"
+    env.setdefault("EMOTION_WORKERS", "0")
+    return env
+
+
+def import_breakdown(module: str, env: Dict[str, str], top: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """Total import seconds of ``module`` and its ``top`` heaviest top-level imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        # Indent 1 is the interpreter's own imports and ``module``; indent 3 is what ``module`` imports directly.
+        if match and len(match.group(3)) <= 3:
+            modules.append((match.group(4), int(match.group(2)) / 1e6))
+    total = next((seconds for name, seconds in modules if name == module), 0.0)
+    heaviest = sorted((m for m in modules if m[0] != module), key=lambda m: -m[1])[:top]
+    return total, heaviest
+
+
+class _Lifespan:
+    """Runs the ASGI lifespan protocol, i.e. the app's startup and shutdown handlers."""
+
+    def __init__(self, app):
+        self.app = app
+        self._receive: asyncio.Queue = asyncio.Queue()
+        self._send: asyncio.Queue = asyncio.Queue()
+
+    async def _event(self, event: str) -> None:
+        await self._receive.put({"type": f"lifespan.{event}"})
+        message = await self._send.get()
+        if message["type"] != f"lifespan.{event}.complete":
+            raise RuntimeError(message.get("message", message["type"]))
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self._task = asyncio.create_task(self.app(scope, self._receive.get, self._send.put))
+        await self._event("startup")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._event("shutdown")
+        await self._task
+
+
+async def _probe(target: str, probe_path: str, ready_path: str, timeout: float) -> Dict[str, float]:
+    import httpx
+
+    module_name, attr = target.split(":")
+    app = getattr(importlib.import_module(module_name), attr)
+    marks = {"imported": time.time()}
+
+    async with _Lifespan(app), httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                                 base_url="http://bench") as client:
+        marks["started"] = time.time()
+        response = await client.get(probe_path)
+        if response.status_code == 200:
+            marks["first_200"] = time.time()
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            response = await client.get(ready_path)
+            if response.status_code == 200 and response.json().get("service", {}).get("ready", True):
+                marks["ready"] = time.time()
+                break
+            await asyncio.sleep(0.01)
+    return marks
+
+
+def run_child(args) -> None:
+    marks = asyncio.run(_probe(args.child, args.probe, args.ready, args.ready_timeout))
+    print("BENCH_MARKS " + json.dumps(marks))
+
+
+def time_startup(app: Dict[str, str], env: Dict[str, str], ready_timeout: float) -> Dict[str, float]:
+    spawned = time.time()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", app["target"], "--probe", app["probe"],
+         "--ready", app["ready"], "--ready-timeout", str(ready_timeout)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH_MARKS "):
+            return {name: mark - spawned for name, mark in json.loads(line[len("BENCH_MARKS "):]).items()}
+    raise RuntimeError(f"{app['target']} did not start:\n{result.stderr[-2000:]}")
+
+
+def bench_app(name: str, args) -> Dict:
+    app = APPS[name]
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as work_dir:
+        env = _child_env(work_dir, warm_up=not args.no_warm_up)
+        for _ in range(args.runs):
+            marks = time_startup(app, env, args.ready_timeout)
+            for mark, seconds in marks.items():
+                timer.samples[f"to_{mark}"].append(seconds)
+
+        module = app["target"].split(":")[0]
+        for _ in range(args.runs):
+            total, heaviest = import_breakdown(module, env, args.top)
+            timer.samples[f"import {module}"].append(total)
+            for imported, seconds in heaviest:
+                timer.samples[f"import {module} > {imported}"].append(seconds)
+
+    return {"iterations": args.runs, "stages": timer.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apps", nargs="+", choices=sorted(APPS), default=list(APPS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level imports to report")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--no-warm-up", action="store_true", help="measure with WARMUP_ON_STARTUP=0")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--probe", help=argparse.SUPPRESS)
+    parser.add_argument("--ready", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    suites = {}
+    for name in args.apps:
+        try:
+            suites[name] = bench_app(name, args)
+        except RuntimeError as e:
+            print(f"\n[{name}] skipped: {e}")
+            continue
+        print_summary(name, suites[name]["stages"])
+
+    if args.output:
+        write_report(build_report(suites, vars(args)), args.output)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
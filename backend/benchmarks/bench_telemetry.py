@@ -0,0 +1,64 @@
+"""
+Cost of the telemetry spans: nanoseconds per empty span, and the share of a
+text turn against the offline fakes that the turn's spans account for.
+
+    cd backend && python -m benchmarks.bench_telemetry --iterations 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+_WORK_DIR = tempfile.mkdtemp(prefix="bench-telemetry-")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("CHAT_HISTORY_PATH", os.path.join(_WORK_DIR, "chat_history.db"))
+
+from benchmarks.fakes import FakeChatModel, FakeDDGS
+from chatbot.telemetry import STAGE_SECONDS, span, trace
+
+
+def span_cost_ns(iterations: int) -> float:
+    with trace():
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            with span("bench", "empty"):
+                pass
+        return (time.perf_counter_ns() - start) / iterations
+
+
+def spans_per_turn() -> int:
+    # Histogram state per label set is [bucket counts..., +Inf count, sum].
+    with STAGE_SECONDS._lock:
+        return int(sum(sum(state[:-1]) for labels, state in STAGE_SECONDS._values.items() if labels[0] == "text"))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--span-iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    from chatbot.text.main import TextTherapyService
+
+    service = TextTherapyService()
+    service.openai = FakeChatModel()
+    service.summarizer.llm = FakeChatModel()
+    service.ddg = FakeDDGS()
+
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        service.search_cache.clear()
+        with trace():
+            service.process_message(f"I feel anxious about work, day {i}", session_id=f"bench-{i % 5}")
+    turn_ms = 1000 * (time.perf_counter() - start) / args.iterations
+
+    per_span_ns = span_cost_ns(args.span_iterations)
+    per_turn = spans_per_turn() / args.iterations
+    overhead_ms = per_turn * per_span_ns / 1e6
+    print(f"span:        {per_span_ns:8.0f} ns")
+    print(f"turn:        {turn_ms:8.3f} ms local work, {per_turn:.1f} spans")
+    print(f"overhead:    {overhead_ms:8.4f} ms per turn ({overhead_ms / turn_ms:.2%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Requests/sec of /text-service/user/input, sync threadpool path vs async path.
+
+Upstream calls are replaced with fakes that sleep for a fixed latency, so the
+numbers only reflect how many turns the server can keep in flight.
+
+    cd backend && python -m benchmarks.bench_text_async --clients 50 200
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("CHAT_HISTORY_PATH", os.path.join(tempfile.mkdtemp(), "chat_history.db"))
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from benchmarks.fakes import FakeChatModel, FakeDDGS
+from chatbot.sessions import resolve_session_id
+from chatbot.text.endpoints import UserInput
+from chatbot.text.main import TextTherapyService
+
+
+def build_app(service: TextTherapyService) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/sync")
+    def sync_input(user_input: UserInput, session_id: str = Depends(resolve_session_id)):
+        return {"result": service.process_message(user_input.text, session_id)["response"]}
+
+    @app.post("/async")
+    async def async_input(user_input: UserInput, session_id: str = Depends(resolve_session_id)):
+        result = await service.aprocess_message(user_input.text, session_id)
+        return {"result": result["response"]}
+
+    return app
+
+
+async def run(app: FastAPI, path: str, clients: int, requests_per_client: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker(i: int):
+            for _ in range(requests_per_client):
+                response = await client.post(path, json={"text": "I can't sleep"},
+                                             headers={"X-Session-ID": f"bench-{i}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return clients * requests_per_client / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--search-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    service = TextTherapyService()
+    service.openai = FakeChatModel(args.llm_latency)
+    service.summarizer.llm = service.openai
+    service.ddg = FakeDDGS(args.search_latency)
+    app = build_app(service)
+
+    print(f"{'clients':>8} {'sync req/s':>12} {'async req/s':>12} {'speedup':>8}")
+    for clients in args.clients:
+        sync_rps = asyncio.run(run(app, "/sync", clients, args.requests))
+        async_rps = asyncio.run(run(app, "/async", clients, args.requests))
+        print(f"{clients:>8} {sync_rps:>12.1f} {async_rps:>12.1f} {async_rps / sync_rps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Per-upload cost of the impression upload path as the number of stored
+images grows: the old ``image_{len(os.listdir(dir)) + 1}.jpg`` naming
+against the content-addressed UploadStore.
+
+    cd backend && python -m benchmarks.bench_uploads --stored 0 1000 10000
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from chatbot.uploads import UploadStore
+
+
+def _image(size: int) -> bytes:
+    return b"\xff\xd8\xff" + os.urandom(size - 3)
+
+
+def legacy_save(save_dir: str, data: bytes) -> str:
+    filename = f"image_{len(os.listdir(save_dir)) + 1}.jpg"
+    file_path = os.path.join(save_dir, filename)
+    with open(file_path, "wb") as f:
+        f.write(data)
+    return file_path
+
+
+def time_uploads(save, uploads: int, size: int) -> float:
+    payloads = [_image(size) for _ in range(uploads)]
+    start = time.perf_counter()
+    for data in payloads:
+        save(data)
+    return 1000 * (time.perf_counter() - start) / uploads
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stored", type=int, nargs="+", default=[0, 1000, 10000])
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per image")
+    args = parser.parse_args()
+
+    print(f"{'stored':>8} {'legacy ms':>10} {'store ms':>10}")
+    for stored in args.stored:
+        with tempfile.TemporaryDirectory(prefix="bench-uploads-") as work_dir:
+            legacy_dir = os.path.join(work_dir, "legacy")
+            os.makedirs(legacy_dir)
+            store = UploadStore(os.path.join(work_dir, "store"), max_bytes=10 * 1024 * 1024)
+            # Small placeholder files: only the directory size matters here.
+            for i in range(stored):
+                data = _image(64)
+                with open(os.path.join(legacy_dir, f"image_{i + 1}.jpg"), "wb") as f:
+                    f.write(data)
+                store.save(io.BytesIO(data))
+
+            legacy_ms = time_uploads(lambda data: legacy_save(legacy_dir, data), args.uploads, args.size)
+            store_ms = time_uploads(lambda data: store.save(io.BytesIO(data)), args.uploads, args.size)
+            print(f"{stored:>8} {legacy_ms:>10.3f} {store_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare two bench_pipeline reports stage by stage and exit non-zero when a
+stage got slower than the threshold allows.
+
+    cd backend && python -m benchmarks.compare before.json after.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+
+def load(path: str) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: Dict, head: Dict, metric: str, threshold: float, min_delta_ms: float) -> Tuple[List, List]:
+    rows, regressions = [], []
+    for suite, head_suite in head["suites"].items():
+        base_stages = base["suites"].get(suite, {}).get("stages", {})
+        for stage, head_stats in sorted(head_suite["stages"].items()):
+            base_stats = base_stages.get(stage)
+            if base_stats is None:
+                rows.append((suite, stage, None, head_stats[metric], None, "new"))
+                continue
+
+            before, after = base_stats[metric], head_stats[metric]
+            change = (after - before) / before if before else 0.0
+            # Sub-millisecond stages are noisy; require an absolute change as well.
+            regressed = change > threshold and after - before > min_delta_ms
+            status = "REGRESSION" if regressed else ("faster" if change < -threshold else "")
+            rows.append((suite, stage, before, after, change, status))
+            if regressed:
+                regressions.append((suite, stage, before, after, change))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "min_ms", "max_ms"])
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    rows, regressions = compare(base, head, args.metric, args.threshold, args.min_delta_ms)
+
+    print(f"base {base['meta'].get('git_commit')}  head {head['meta'].get('git_commit')}  metric {args.metric}")
+    print(f"{'suite':<8} {'stage':<32} {'base':>10} {'head':>10} {'change':>8}")
+    for suite, stage, before, after, change, status in rows:
+        before_text = f"{before:10.3f}" if before is not None else f"{'-':>10}"
+        change_text = f"{change:+8.1%}" if change is not None else f"{'':>8}"
+        print(f"{suite:<8} {stage:<32} {before_text} {after:10.3f} {change_text} {status}")
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
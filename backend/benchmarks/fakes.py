@@ -0,0 +1,228 @@
+"""
+Offline stand-ins for the upstream services, so benchmarks run without API
+keys or network access. Each fake sleeps for a configurable latency and
+returns responses shaped like the real client's.
+"""
+import asyncio
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from chatbot.speach.streaming import streaming_wav_header
+
+DEFAULT_RESPONSE = (
+    "It sounds like you have been carrying a lot lately. It makes sense to feel tired when work keeps piling up. "
+    "Could you tell me a little more about what a typical evening looks like for you? "
+    "We can look for one small change that might help you rest."
+)
+
+
+class FakeChatModel:
+    """ChatOpenAI stand-in: ``latency`` before the first token, then ``tokens_per_second``."""
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0, response: str = DEFAULT_RESPONSE):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response = response
+        self.tokens = [word + " " for word in response.split()]
+
+    @property
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def invoke(self, messages):
+        time.sleep(self.latency + self._token_delay * len(self.tokens))
+        return SimpleNamespace(content=self.response)
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.latency + self._token_delay * len(self.tokens))
+        return SimpleNamespace(content=self.response)
+
+    def stream(self, messages):
+        time.sleep(self.latency)
+        for token in self.tokens:
+            time.sleep(self._token_delay)
+            yield SimpleNamespace(content=token)
+
+    async def astream(self, messages):
+        await asyncio.sleep(self.latency)
+        for token in self.tokens:
+            await asyncio.sleep(self._token_delay)
+            yield SimpleNamespace(content=token)
+
+
+class FakeDDGS:
+    def __init__(self, latency: float = 0.0, base_url: str = "https://example.com"):
+        self.latency = latency
+        self.base_url = base_url
+
+    def text(self, query, max_results=3):
+        time.sleep(self.latency)
+        return [
+            {"title": f"Result {i} for {query}", "href": f"{self.base_url}/page/{i}",
+             "body": f"Snippet {i} about {query}."}
+            for i in range(max_results)
+        ]
+
+
+def fixture_wav(seconds: float = 1.0, sample_rate: int = 16000) -> bytes:
+    """Silent mono linear16 WAV."""
+    data = bytes(int(seconds * sample_rate) * 2)
+    return streaming_wav_header(sample_rate=sample_rate, data_size=len(data)) + data
+
+
+class _FakeSpeak:
+    def __init__(self, latency: float, seconds_per_char: float, sample_rate: int):
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+        self.sample_rate = sample_rate
+
+    def _audio(self, source: Dict, options) -> bytes:
+        time.sleep(self.latency)
+        audio = fixture_wav(len(source["text"]) * self.seconds_per_char, self.sample_rate)
+        if getattr(options, "container", None) == "none":
+            return audio[44:]
+        return audio
+
+    def stream_memory(self, source: Dict, options, **kwargs):
+        return SimpleNamespace(stream_memory=io.BytesIO(self._audio(source, options)))
+
+
+class _FakeListen:
+    def __init__(self, latency: float, transcript: str):
+        self.latency = latency
+        self.transcript = transcript
+
+    def transcribe_file(self, source: Dict, options, **kwargs):
+        time.sleep(self.latency)
+        alternative = SimpleNamespace(transcript=self.transcript)
+        return SimpleNamespace(results=SimpleNamespace(channels=[SimpleNamespace(alternatives=[alternative])]))
+
+
+class FakeDeepgram:
+    """DeepgramClient stand-in covering ``speak.rest.v("1")`` and ``listen.rest.v("1")``."""
+
+    def __init__(self, tts_latency: float = 0.0, stt_latency: float = 0.0,
+                 transcript: str = "I have been feeling anxious about work and I can't sleep.",
+                 seconds_per_char: float = 0.06, sample_rate: int = 16000):
+        speak = _FakeSpeak(tts_latency, seconds_per_char, sample_rate)
+        listen = _FakeListen(stt_latency, transcript)
+        self.speak = SimpleNamespace(rest=SimpleNamespace(v=lambda version: speak))
+        self.listen = SimpleNamespace(rest=SimpleNamespace(v=lambda version: listen))
+
+
+class FakeEmotionAnalyzer:
+    """
+    EmotionAnalyzer stand-in returning a DeepFace-shaped result after
+    ``latency``, plus ``seconds_per_megapixel`` of the input image to model
+    detection cost. Sized inputs get a face ``region`` in the image centre.
+    """
+
+    def __init__(self, latency: float = 0.0, seconds_per_megapixel: float = 0.0):
+        self.latency = latency
+        self.seconds_per_megapixel = seconds_per_megapixel
+        self.actions = ["emotion", "gender"]
+        self.detector_backend = "fake"
+
+    def load(self) -> None:
+        pass
+
+    def analyze(self, img) -> List[Dict]:
+        result = {
+            "dominant_emotion": "neutral",
+            "emotion": {"neutral": 80.0, "sad": 15.0, "happy": 5.0},
+            "gender": {"Woman": 60.0, "Man": 40.0},
+        }
+        delay = self.latency
+        if self.seconds_per_megapixel:
+            from chatbot.speach.face_preprocess import load_image
+
+            height, width = load_image(img).shape[:2]
+            delay += self.seconds_per_megapixel * width * height / 1e6
+            result["region"] = {"x": int(width * 0.35), "y": int(height * 0.3),
+                                "w": int(width * 0.3), "h": int(height * 0.4)}
+        time.sleep(delay)
+        return [result]
+
+    def status(self) -> Dict:
+        return {"ready": True, "loaded": True, "error": None}
+
+
+def _fixture_page(index: int, paragraphs: int) -> bytes:
+    body = "".join(
+        f"<p>Paragraph {i} of page {index}. Sleep hygiene, stress and anxiety are common topics "
+        f"for people looking for support, and small routines often help.</p>"
+        for i in range(paragraphs)
+    )
+    return (
+        f"<html><head><title>Page {index}</title><style>p {{ color: #333; }}</style>"
+        f"<script>var tracking = {index};</script></head>"
+        f"<body><nav>Home | About</nav><article>{body}</article><footer>Footer</footer></body></html>"
+    ).encode("utf-8")
+
+
+class HtmlFixtureServer:
+    """
+    Local HTTP server for WebScraper benchmarks. ``/page/<n>`` returns a
+    generated article page after ``latency`` seconds.
+
+        with HtmlFixtureServer(latency=0.05) as server:
+            scraper.scrape_content(server.url(0))
+    """
+
+    def __init__(self, latency: float = 0.0, paragraphs: int = 40):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per request.
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                try:
+                    index = int(self.path.rsplit("/", 1)[-1])
+                except ValueError:
+                    self.send_error(404)
+                    return
+                time.sleep(fixture.latency)
+                body = _fixture_page(index, fixture.paragraphs)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, index: int) -> str:
+        return f"{self.base_url}/page/{index}"
+
+    def start(self) -> "HtmlFixtureServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "HtmlFixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,109 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class StageTimer:
+    """
+    Collects wall-clock samples per named stage. Stages nest, and a stage's
+    time includes the stages it calls.
+
+        timer.wrap(service, "search_duckduckgo", "search")
+        with timer.stage("serialize"):
+            ...
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.samples[name].append(elapsed)
+
+    def wrap(self, obj: Any, attr: str, name: Optional[str] = None) -> None:
+        """Time every call of ``obj.attr`` by shadowing it on the instance."""
+        original: Callable = getattr(obj, attr)
+        name = name or attr
+
+        def timed(*args, **kwargs):
+            with self.stage(name):
+                return original(*args, **kwargs)
+
+        setattr(obj, attr, timed)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.samples.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+        return {
+            name: {
+                "count": len(values),
+                "mean_ms": 1000 * sum(values) / len(values),
+                "p50_ms": 1000 * percentile(values, 50),
+                "p95_ms": 1000 * percentile(values, 95),
+                "min_ms": 1000 * min(values),
+                "max_ms": 1000 * max(values),
+            }
+            for name, values in samples.items() if values
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(suites: Dict[str, Dict], args: Dict) -> Dict:
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": args,
+        },
+        "suites": suites,
+    }
+
+
+def write_report(report: Dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def print_summary(suite: str, stages: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n[{suite}]")
+    print(f"{'stage':<32} {'count':>6} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, stats in sorted(stages.items(), key=lambda item: -item[1]["mean_ms"]):
+        print(f"{name:<32} {stats['count']:>6} {stats['mean_ms']:>10.3f} {stats['p50_ms']:>10.3f} "
+              f"{stats['p95_ms']:>10.3f}")
@@ -0,0 +1,215 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with an optional per-entry time to live.
+
+    With ``sliding=True`` every hit pushes the entry's expiry forward, which
+    turns the TTL into an idle timeout.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None, sliding: bool = False,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sliding = sliding
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _expiry(self, ttl: Optional[float] = None) -> Optional[float]:
+        ttl = self.ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl is not None else None
+
+    def _evict(self, key: Hashable) -> None:
+        _, value = self._data.pop(key)
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._evict(key)
+                self.misses += 1
+                return default
+
+            if self.sliding:
+                self._data[key] = (self._expiry(), value)
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (self._expiry(ttl), value)
+            self._data.move_to_end(key)
+            self._purge()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            over_capacity = len(self._data) > self.max_entries
+            expired = expires_at is not None and expires_at <= now
+            if not (over_capacity or (self.sliding and expired)):
+                break
+            self._evict(key)
+
+    def snapshot(self) -> List[Tuple[Hashable, Any, Optional[float]]]:
+        """Live entries in LRU order as (key, value, remaining ttl in seconds)."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, None if expires_at is None else expires_at - now)
+                for key, (expires_at, value) in self._data.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def file_digest(path: str, salt: str = "", chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(salt.encode("utf-8"), digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-bounded directory of cache files keyed by hex digests. Writes are
+    atomic (temp file + rename), reads refresh the file's mtime, and the least
+    recently used files are evicted once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def path_for(self, key: str, count: bool = True) -> Optional[str]:
+        """Path of the cached file for ``key`` (marked as recently used), or None."""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            if count:
+                self.misses += 1
+            return None
+        if count:
+            self.hits += 1
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+        return path
+
+    def _evict(self) -> None:
+        # Rescan so files written by other processes are accounted for, then
+        # trim to 90% of the budget to avoid evicting on every write.
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for _, path, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,349 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from chatbot.telemetry import stats_samples
+
+load_dotenv()
+
+UPSTREAMS = {
+    "openai": "https://api.openai.com",
+    "deepgram": "https://api.deepgram.com",
+}
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("HTTP2", "1").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("h2 is not installed, upstream clients use HTTP/1.1")
+        return False
+
+
+class _Slots:
+    """
+    Per-upstream concurrency limit, with counters for the stats endpoint.
+
+    Sync and async callers draw on the same budget: threads wait on a
+    condition, coroutines on a future that a release wakes from whichever
+    thread it runs on.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self.requests = 0
+        self.queued = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    def _take(self, waited: bool) -> bool:
+        # Caller holds the lock.
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        self.requests += 1
+        self.queued += waited
+        return True
+
+    def acquire(self) -> None:
+        with self._available:
+            waited = False
+            while not self._take(waited):
+                waited = True
+                self._available.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        waited = False
+        while True:
+            with self._lock:
+                if self._take(waited):
+                    return
+                future = loop.create_future()
+                waiter = (loop, future)
+                self._async_waiters.append(waiter)
+            waited = True
+            try:
+                await future
+            except BaseException:
+                with self._lock:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+                    else:
+                        # A release already picked this waiter; hand its wakeup on.
+                        self._wake_async_waiter()
+                raise
+
+    def _wake_async_waiter(self) -> None:
+        # Caller holds the lock.
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            if not future.done():
+                loop.call_soon_threadsafe(_wake, future)
+                return
+
+    def release(self, failed: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += failed
+            # Wake one waiter of each kind; whichever gets the lock first takes the slot
+            # and the other goes back to waiting.
+            self._available.notify()
+            self._wake_async_waiter()
+
+    arelease = release
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "requests": self.requests,
+                "queued": self.queued,
+                "errors": self.errors,
+                "in_flight": self.in_flight
+            }
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Frees the slot once the body is read to the end or closed, whichever comes first."""
+
+    def __init__(self, stream: httpx.SyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def _release_slot(self) -> None:
+        if self._release:
+            self._release()
+            self._release = None
+
+    def __iter__(self):
+        yield from self._stream
+        self._release_slot()
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release_slot()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    def _release_slot(self) -> None:
+        if self._release:
+            self._release()
+            self._release = None
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+        self._release_slot()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release_slot()
+
+
+class PooledTransport(httpx.BaseTransport):
+    """
+    Keep-alive connection pool shared by every client of one upstream.
+
+    The Deepgram SDK builds and closes an ``httpx.Client`` per request, which
+    would close its transport too, so ``close()`` is a no-op here and the
+    pool is only torn down by ``ClientRegistry.aclose()``. A concurrency slot
+    is held from request start until the response body is closed.
+    """
+
+    def __init__(self, slots: _Slots, limits: httpx.Limits, http2: bool):
+        self.slots = slots
+        self._transport = httpx.HTTPTransport(limits=limits, http2=http2, retries=1)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.slots.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.slots.release(failed=True)
+            raise
+        response.stream = _ReleasingStream(response.stream, self.slots.release)
+        return response
+
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        self._transport.close()
+
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    def __init__(self, slots: _Slots, limits: httpx.Limits, http2: bool):
+        self.slots = slots
+        self._transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=1)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.slots.aacquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.slots.arelease(failed=True)
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self.slots.arelease)
+        return response
+
+    async def aclose(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        await self._transport.aclose()
+
+
+class ClientRegistry:
+    """
+    Application-scoped upstream clients. Components ask for the shared
+    Deepgram client and chat model instead of building their own, so every
+    turn reuses warm keep-alive (and, with h2 installed, HTTP/2) connections.
+
+    Pool sizes come from HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE and
+    HTTP_KEEPALIVE_EXPIRY; concurrent requests per upstream are capped by
+    <UPSTREAM>_CONCURRENCY (e.g. OPENAI_CONCURRENCY). Apps call ``start()``
+    on startup and ``aclose()`` on shutdown.
+    """
+
+    def __init__(self):
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+        )
+        self.http2 = _http2_enabled()
+        self._slots: Dict[str, _Slots] = {}
+        self._transports: Dict[str, PooledTransport] = {}
+        self._async_transports: Dict[str, AsyncPooledTransport] = {}
+        self._deepgram = None
+        self._chat_models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _slots_for(self, upstream: str) -> _Slots:
+        slots = self._slots.get(upstream)
+        if slots is None:
+            limit = int(os.getenv(f"{upstream.upper()}_CONCURRENCY", "16"))
+            slots = self._slots[upstream] = _Slots(limit)
+        return slots
+
+    def transport(self, upstream: str) -> PooledTransport:
+        with self._lock:
+            transport = self._transports.get(upstream)
+            if transport is None:
+                transport = self._transports[upstream] = PooledTransport(
+                    self._slots_for(upstream), self.limits, self.http2
+                )
+            return transport
+
+    def async_transport(self, upstream: str) -> AsyncPooledTransport:
+        with self._lock:
+            transport = self._async_transports.get(upstream)
+            if transport is None:
+                transport = self._async_transports[upstream] = AsyncPooledTransport(
+                    self._slots_for(upstream), self.limits, self.http2
+                )
+            return transport
+
+    def deepgram(self):
+        """Shared DeepgramClient; pass ``transport=clients.transport("deepgram")`` on REST calls."""
+        from deepgram import DeepgramClient
+
+        with self._lock:
+            if self._deepgram is None:
+                self._deepgram = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"))
+            return self._deepgram
+
+    def chat_model(self, model: str = "gpt-4o-mini"):
+        """Shared ChatOpenAI over the pooled sync and async transports."""
+        from langchain_openai import ChatOpenAI
+
+        with self._lock:
+            chat_model = self._chat_models.get(model)
+        if chat_model is None:
+            chat_model = ChatOpenAI(
+                model=model, api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=httpx.Client(transport=self.transport("openai")),
+                http_async_client=httpx.AsyncClient(transport=self.async_transport("openai"))
+            )
+            with self._lock:
+                chat_model = self._chat_models.setdefault(model, chat_model)
+        return chat_model
+
+    async def start(self) -> None:
+        """
+        Open a connection to each upstream in use so the first turn skips
+        DNS and the TLS handshake. Disable with HTTP_PREWARM=0.
+        """
+        if os.getenv("HTTP_PREWARM", "1").lower() not in ("1", "true", "yes"):
+            return
+        with self._lock:
+            transports = list(self._transports.items())
+            async_transports = list(self._async_transports.items())
+
+        def connect(upstream: str, transport: PooledTransport) -> None:
+            with httpx.Client(transport=transport, timeout=5.0) as client:
+                client.head(UPSTREAMS[upstream])
+
+        async def aconnect(upstream: str, transport: AsyncPooledTransport) -> None:
+            async with httpx.AsyncClient(transport=transport, timeout=5.0) as client:
+                await client.head(UPSTREAMS[upstream])
+
+        results = await asyncio.gather(
+            *(asyncio.to_thread(connect, upstream, transport) for upstream, transport in transports),
+            *(aconnect(upstream, transport) for upstream, transport in async_transports),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Could not pre-connect to upstream: {result}")
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transports = list(self._transports.values())
+            async_transports = list(self._async_transports.values())
+        for transport in transports:
+            transport.shutdown()
+        for transport in async_transports:
+            await transport.shutdown()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            slots = dict(self._slots)
+        return {
+            "http2": self.http2,
+            "upstreams": {upstream: s.stats() for upstream, s in slots.items()}
+        }
+
+    def metric_samples(self):
+        samples = []
+        for upstream, stats in self.stats()["upstreams"].items():
+            samples += stats_samples("chatbot_upstream", {"upstream": upstream}, stats)
+        return samples
+
+
+clients = ClientRegistry()
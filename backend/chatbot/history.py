@@ -0,0 +1,242 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_SESSION = "default"
+LEGACY_HISTORY_PATH = "chat_history.json"
+
+
+class HistoryStore(abc.ABC):
+    """Append-only conversation storage with "last N for session" reads."""
+
+    @abc.abstractmethod
+    def append(self, session_id: str, record: Dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    def recent(self, session_id: str, n: Optional[int] = None) -> List[Dict]:
+        ...
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        ...
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonlHistoryStore(HistoryStore):
+    """
+    One JSON record per line, written with a single O_APPEND write so several
+    processes can share the file. Reads use a per-session offset index that is
+    extended incrementally from the last scanned position.
+
+    Appends are fsynced in batches: after ``fsync_every`` records, or by a
+    timer ``fsync_interval`` seconds after the first unsynced one, so a quiet
+    session's last message does not wait for the next append.
+    """
+
+    def __init__(self, path: str = "chat_history.jsonl", fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+        self._offsets: Dict[str, List[int]] = {}
+        self._scanned = 0
+
+    def append(self, session_id: str, record: Dict) -> None:
+        line = json.dumps({"session_id": session_id, **record}, ensure_ascii=False) + "\n"
+        with self._lock:
+            os.write(self._fd, line.encode("utf-8"))
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _sync(self) -> None:
+        os.fsync(self._fd)
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _scan(self, f) -> None:
+        f.seek(self._scanned)
+        offset = self._scanned
+        for line in f:
+            if not line.endswith(b"\n"):
+                # A concurrent writer is mid-record; pick it up on the next scan.
+                break
+            try:
+                session_id = json.loads(line).get("session_id", DEFAULT_SESSION)
+                self._offsets.setdefault(session_id, []).append(offset)
+            except ValueError:
+                pass
+            offset += len(line)
+        self._scanned = offset
+
+    def recent(self, session_id: str, n: Optional[int] = None) -> List[Dict]:
+        with self._lock, open(self.path, "rb") as f:
+            self._scan(f)
+            offsets = self._offsets.get(session_id, [])
+            if n is not None:
+                offsets = offsets[-n:] if n > 0 else []
+
+            records = []
+            for offset in offsets:
+                f.seek(offset)
+                record = json.loads(f.readline())
+                record.pop("session_id", None)
+                records.append(record)
+            return records
+
+    def count(self) -> int:
+        with self._lock, open(self.path, "rb") as f:
+            self._scan(f)
+            return sum(len(offsets) for offsets in self._offsets.values())
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._sync()
+            elif self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+class SqliteHistoryStore(HistoryStore):
+    """
+    SQLite in WAL mode. ``synchronous=NORMAL`` batches fsyncs into WAL
+    checkpoints, and the (session_id, id) index keeps tail reads independent
+    of total history size.
+    """
+
+    def __init__(self, path: str = "chat_history.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "session_id TEXT NOT NULL, "
+            "payload TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+
+    def append(self, session_id: str, record: Dict) -> None:
+        payload = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("INSERT INTO messages (session_id, payload) VALUES (?, ?)", (session_id, payload))
+
+    def append_many(self, session_id: str, records: List[Dict]) -> None:
+        rows = [(session_id, json.dumps(record, ensure_ascii=False)) for record in records]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT INTO messages (session_id, payload) VALUES (?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def recent(self, session_id: str, n: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, -1 if n is None else n)
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in reversed(rows)]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def flush(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+
+def migrate_json_history(store: HistoryStore, json_path: str = LEGACY_HISTORY_PATH,
+                         session_id: str = DEFAULT_SESSION) -> int:
+    """
+    Import a legacy chat_history.json list into an empty ``store`` and rename
+    the file. A store that already has history is left alone, and so is the
+    JSON file, so nothing is marked migrated without having been imported.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    if store.count() != 0:
+        print(f"Skipping history migration, the history store already has messages; {json_path} is left in place")
+        return 0
+
+    # Claim the file with an atomic rename so only one worker process migrates it.
+    claimed_path = f"{json_path}.migrating.{os.getpid()}"
+    try:
+        os.rename(json_path, claimed_path)
+    except FileNotFoundError:
+        return 0
+
+    try:
+        with open(claimed_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except ValueError as e:
+        print(f"Skipping history migration, {json_path} is not valid JSON: {e}")
+        os.rename(claimed_path, json_path)
+        return 0
+
+    if store.count() != 0:
+        # Another process started writing history between the check and the claim.
+        os.rename(claimed_path, json_path)
+        return 0
+
+    if isinstance(store, SqliteHistoryStore):
+        store.append_many(session_id, records)
+    else:
+        for record in records:
+            store.append(session_id, record)
+    store.flush()
+
+    os.replace(claimed_path, json_path + ".migrated")
+    return len(records)
+
+
+def get_history_store(backend: Optional[str] = None, path: Optional[str] = None) -> HistoryStore:
+    backend = backend or os.getenv("CHAT_HISTORY_BACKEND", "sqlite")
+    path = path or os.getenv("CHAT_HISTORY_PATH")
+
+    if backend == "jsonl":
+        store = JsonlHistoryStore(path or "chat_history.jsonl")
+    elif backend == "sqlite":
+        store = SqliteHistoryStore(path or "chat_history.db")
+    else:
+        raise ValueError(f"Unknown history backend: {backend}")
+
+    migrated = migrate_json_history(store)
+    if migrated:
+        print(f"Migrated {migrated} messages from {LEGACY_HISTORY_PATH}")
+    return store
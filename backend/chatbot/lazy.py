@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    """
+    A component built on first use, or ahead of time by a startup warm-up
+    task, instead of at import time. Factories import their heavy modules
+    (LangChain, Deepgram, DeepFace/TensorFlow) themselves, so importing the
+    app only registers routes.
+
+        text_service = Lazy(_build_text_service, "text_service")
+        service = await text_service.aget()
+    """
+
+    def __init__(self, factory: Callable[[], T], name: str):
+        self.factory = factory
+        self.name = name
+        self.build_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> T:
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    start = time.perf_counter()
+                    try:
+                        value = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.build_time = time.perf_counter() - start
+                    self.error = None
+                    self._value = value
+                    print(f"Built {self.name} in {self.build_time:.2f}s")
+        return self._value
+
+    async def aget(self) -> T:
+        """``get`` without blocking the event loop while the component is built."""
+        if self._value is not None:
+            return self._value
+        return await asyncio.to_thread(self.get)
+
+    def peek(self) -> Optional[T]:
+        """The component if it has been built, without building it."""
+        return self._value
+
+    def status(self) -> Dict:
+        return {"ready": self.ready, "build_seconds": self.build_time, "error": self.error}
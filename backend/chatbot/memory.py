@@ -0,0 +1,355 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chatbot.cache import TTLCache
+from chatbot.history import HistoryStore
+from chatbot.prompt import count_tokens
+from chatbot.search import STOPWORDS
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process per history file
+    fcntl = None
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+class HashedTfidfEmbedder:
+    """
+    Feature-hashed bag of words and bigrams with sublinear term frequency.
+    Vectors are L2-normalized; IDF weighting is applied by the index at
+    query time from its own document frequencies.
+    """
+
+    name = "hashed"
+    uses_idf = True
+
+    def __init__(self, dim: int = 2048):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in _TOKEN_RE.findall(text.lower())
+                 if w not in STOPWORDS and len(w) > 1 and not w.isdigit()]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # The sign bit keeps colliding features from always adding up.
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    uses_idf = False
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = f"st:{model_name}"
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+def get_embedder(kind: Optional[str] = None):
+    kind = kind or os.getenv("MEMORY_EMBEDDER", "hashed")
+    if kind == "sentence-transformers":
+        try:
+            return SentenceTransformerEmbedder(os.getenv("MEMORY_MODEL", "all-MiniLM-L6-v2"))
+        except Exception as e:
+            print(f"Falling back to hashed TF-IDF memory embeddings: {e}")
+    elif kind != "hashed":
+        raise ValueError(f"Unknown memory embedder: {kind}")
+    return HashedTfidfEmbedder(int(os.getenv("MEMORY_DIM", "2048")))
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on ``<path>.lock``, shared by every process using the index."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class MemoryIndex:
+    """
+    Vectors for one session's turns in a single growable float32 array, so
+    a search is one matrix-vector product plus a partial sort. With a ``path``
+    every added turn is also appended to ``<path>.rec`` as one JSON line
+    holding both the text and its float16 vector, so persistence costs one
+    write per turn and the two can never get out of step.
+
+    The text and voice services and every worker process share these files.
+    Writers hold a file lock, and each process reads what others appended
+    since its last look before it searches or appends. Once the file holds
+    25% more than ``max_records`` turns, it is rewritten with the newest
+    ``max_records``.
+    """
+
+    _FORMAT = 2
+
+    def __init__(self, embedder, path: Optional[str] = None, max_records: int = 2000):
+        self.embedder = embedder
+        self.path = path
+        self.max_records = max_records
+        self.records: List[Dict] = []
+        self._vectors = np.zeros((16, embedder.dim), dtype=np.float32)
+        self._df = np.zeros(embedder.dim, dtype=np.float32)
+        self.lock = threading.Lock()
+        # How far into <path>.rec this process has read, and which file that was.
+        self._offset = 0
+        self._inode: Optional[int] = None
+        self._file_records = 0
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _extend(self, records: List[Dict], vectors: np.ndarray) -> None:
+        size = len(self.records)
+        if size + len(records) > len(self._vectors):
+            grown = np.zeros((max(2 * len(self._vectors), size + len(records)), self.embedder.dim), dtype=np.float32)
+            grown[:size] = self._vectors[:size]
+            self._vectors = grown
+        self._vectors[size:size + len(records)] = vectors
+        self._df += (vectors != 0).sum(axis=0)
+        self.records.extend(records)
+
+    def _reset(self) -> None:
+        self.records = []
+        self._vectors = np.zeros((16, self.embedder.dim), dtype=np.float32)
+        self._df = np.zeros(self.embedder.dim, dtype=np.float32)
+
+    def _encode(self, records: List[Dict], vectors: np.ndarray) -> bytes:
+        lines = []
+        for record, vector in zip(records, vectors.astype(np.float16)):
+            entry = {**record, "vector": base64.b64encode(vector.tobytes()).decode("ascii")}
+            lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        return "".join(lines).encode("utf-8")
+
+    def _decode(self, data: bytes) -> Tuple[List[Dict], np.ndarray]:
+        records, vectors = [], []
+        for line in data.splitlines():
+            entry = json.loads(line)
+            vectors.append(np.frombuffer(base64.b64decode(entry.pop("vector")), dtype=np.float16))
+            records.append(entry)
+        if not records:
+            return [], np.zeros((0, self.embedder.dim), dtype=np.float32)
+        return records, np.stack(vectors).astype(np.float32)
+
+    def _sync(self) -> None:
+        """Read the entries other processes appended; reload if the file was rewritten."""
+        try:
+            with open(f"{self.path}.rec", "rb") as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_ino != self._inode or stat.st_size < self._offset:
+                    self._reset()
+                    self._offset, self._inode, self._file_records = 0, stat.st_ino, 0
+                elif stat.st_size == self._offset:
+                    return
+                f.seek(self._offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+
+        # A line still being written has no newline yet; leave it for the next sync.
+        data = data[:data.rfind(b"\n") + 1]
+        records, vectors = self._decode(data)
+        self._extend(records, vectors)
+        self._offset += len(data)
+        self._file_records += len(records)
+
+    def _rewrite(self) -> None:
+        """Replace the file with the in-memory entries; the caller holds the file lock."""
+        size = len(self.records)
+        data = self._encode(self.records, self._vectors[:size])
+        tmp_path = f"{self.path}.rec.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, f"{self.path}.rec")
+        self._offset, self._inode, self._file_records = len(data), os.stat(f"{self.path}.rec").st_ino, size
+
+    def _trim(self) -> None:
+        size = len(self.records)
+        if size <= self.max_records:
+            return
+        keep = self._vectors[size - self.max_records:size].copy()
+        records = self.records[size - self.max_records:]
+        self._reset()
+        self._extend(records, keep)
+
+    def add(self, record: Dict) -> None:
+        vectors = self.embedder.embed([record["text"]])
+        with self.lock:
+            if not self.path:
+                self._extend([record], vectors)
+                return
+
+            with _file_lock(self.path):
+                self._sync()
+                self._extend([record], vectors)
+                if self._file_records + 1 > self.max_records * 1.25:
+                    self._trim()
+                    self._rewrite()
+                    return
+                data = self._encode([record], vectors)
+                with open(f"{self.path}.rec", "ab") as f:
+                    f.write(data)
+                if self._inode is None:
+                    self._inode = os.stat(f"{self.path}.rec").st_ino
+                self._offset += len(data)
+                self._file_records += 1
+
+    def search(self, query: str, k: int = 4, exclude_last: int = 0,
+               min_score: float = 0.1) -> List[Tuple[float, Dict]]:
+        query_vector = self.embedder.embed([query])[0]
+        with self.lock:
+            if self.path:
+                self._sync()
+            size = len(self.records) - exclude_last
+            if size <= 0 or k <= 0:
+                return []
+            vectors = self._vectors[:size]
+            if self.embedder.uses_idf:
+                idf = np.log((1 + len(self.records)) / (1 + self._df)) + 1
+                weights = idf * idf
+                query_norm = np.sqrt(np.dot(query_vector * query_vector, weights))
+                row_norms = np.sqrt((vectors * vectors) @ weights)
+                scores = (vectors @ (query_vector * weights)) / np.maximum(row_norms * query_norm, 1e-12)
+            else:
+                scores = vectors @ query_vector
+
+            k = min(k, size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self.records[i]) for i in top if scores[i] >= min_score]
+
+    def _meta(self) -> Dict:
+        return {"embedder": self.embedder.name, "dim": self.embedder.dim, "format": self._FORMAT}
+
+    @classmethod
+    def build(cls, embedder, path: str, records: List[Dict], max_records: int = 2000) -> "MemoryIndex":
+        """Index ``records`` and write the files; the caller holds the file lock."""
+        index = cls(embedder, path, max_records)
+        records = records[-max_records:]
+        vectors = embedder.embed([r["text"] for r in records]) if records else np.zeros((0, embedder.dim))
+        index._extend(records, vectors)
+
+        # Files of the previous two-file format, or of another embedder.
+        for suffix in (".meta", ".vec", ".jsonl"):
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+        index._rewrite()
+        # The meta file is written last, so a half-built index is rebuilt again on the next load.
+        with open(f"{path}.meta", "w", encoding="utf-8") as f:
+            json.dump(index._meta(), f)
+        return index
+
+    @classmethod
+    def load(cls, embedder, path: str, max_records: int = 2000) -> Optional["MemoryIndex"]:
+        index = cls(embedder, path, max_records)
+        try:
+            with open(f"{path}.meta", "r", encoding="utf-8") as f:
+                if json.load(f) != index._meta():
+                    return None
+            if not os.path.exists(f"{path}.rec"):
+                return None
+            index._sync()
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            print(f"Rebuilding memory index {path}: {e}")
+            return None
+        return index
+
+
+class MemoryStore:
+    """
+    Per-session semantic memory over saved turns. Indexes live in an LRU of
+    active sessions, are persisted append-only next to the chat history, and
+    are rebuilt from the history store when missing or built with a
+    different embedder. Each session keeps at most MEMORY_MAX_RECORDS turns.
+    """
+
+    def __init__(self, store: HistoryStore, format_message: Callable[[Dict], str],
+                 directory: Optional[str] = None, embedder=None, max_sessions: int = 256):
+        self.store = store
+        self.format_message = format_message
+        self.directory = directory or os.getenv("MEMORY_DIR") or f"{store.path}.memory"
+        self.embedder = embedder or get_embedder()
+        self.top_k = int(os.getenv("MEMORY_TOP_K", "4"))
+        self.token_budget = int(os.getenv("MEMORY_TOKEN_BUDGET", "300"))
+        self.min_score = float(os.getenv("MEMORY_MIN_SCORE", "0.1"))
+        self.max_records = int(os.getenv("MEMORY_MAX_RECORDS", "2000"))
+        self._indexes = TTLCache(max_entries=max_sessions)
+        self._load_lock = threading.Lock()
+
+    def _path(self, session_id: str) -> str:
+        key = hashlib.blake2b(session_id.encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def _record(self, message: Dict) -> Dict:
+        return {"text": self.format_message(message), "timestamp": message.get("timestamp")}
+
+    def get(self, session_id: str) -> MemoryIndex:
+        index = self._indexes.get(session_id)
+        if index is not None:
+            return index
+
+        with self._load_lock:
+            index = self._indexes.get(session_id)
+            if index is None:
+                path = self._path(session_id)
+                index = MemoryIndex.load(self.embedder, path, self.max_records)
+                if index is None:
+                    # Under the file lock, so concurrent processes build it once rather than twice.
+                    with _file_lock(path):
+                        index = MemoryIndex.load(self.embedder, path, self.max_records)
+                        if index is None:
+                            history = self.store.recent(session_id)
+                            index = MemoryIndex.build(self.embedder, path, [self._record(m) for m in history],
+                                                      self.max_records)
+                self._indexes.put(session_id, index)
+            return index
+
+    def add(self, session_id: str, message: Dict) -> None:
+        self.get(session_id).add(self._record(message))
+
+    def relevant(self, session_id: str, query: str, exclude_last: int = 0) -> List[str]:
+        """Top-k past turns for ``query`` within the token budget, oldest first."""
+        hits = self.get(session_id).search(query, self.top_k, exclude_last, self.min_score)
+        kept, used = [], 0
+        for _, record in hits:
+            tokens = count_tokens(record["text"]) + 1
+            if used + tokens > self.token_budget:
+                continue
+            kept.append(record)
+            used += tokens
+        kept.sort(key=lambda r: r.get("timestamp") or "")
+        return [record["text"] for record in kept]
+
+    def stats(self) -> Dict:
+        return self._indexes.stats()
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from chatbot.sessions import Session
+from chatbot.telemetry import in_context, span
+
+
+_encoding_lock = threading.Lock()
+_encoding_loaded = False
+_encoding_value = None
+
+
+def _encoding():
+    """The tiktoken encoding, loaded once even when many threads ask for it at the same time."""
+    global _encoding_loaded, _encoding_value
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                _encoding_value = _load_encoding()
+                _encoding_loaded = True
+    return _encoding_value
+
+
+def _load_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    for name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(name)
+        except ValueError:
+            continue
+        except Exception as e:
+            # Encodings are downloaded on first use, which fails on offline hosts.
+            print(f"Falling back to estimated token counts: {e}")
+            return None
+    return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        # ~4 characters per token for English text
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt from sections under a token budget. Space is granted in
+    priority order; a section that does not fit is truncated, or for line
+    sections its oldest lines are dropped (the newest one is truncated if it
+    alone does not fit). Output keeps insertion order.
+
+    The budget covers the whole request: text sent alongside the prompt, such
+    as the system message, is counted against it with ``reserve``.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self._sections: List[Dict] = []
+
+    def reserve(self, text: str) -> "PromptBuilder":
+        self.budget -= count_tokens(text)
+        return self
+
+    def add(self, text: str, priority: int = 0) -> "PromptBuilder":
+        if text:
+            self._sections.append({"text": text, "lines": None, "priority": priority})
+        return self
+
+    def add_lines(self, header: str, lines: List[str], priority: int = 0) -> "PromptBuilder":
+        if lines:
+            self._sections.append({"text": header, "lines": lines, "priority": priority})
+        return self
+
+    def _fit(self, section: Dict, remaining: int) -> Tuple[str, int]:
+        if section["lines"] is None:
+            tokens = count_tokens(section["text"])
+            if tokens <= remaining:
+                return section["text"], tokens
+            text = truncate_tokens(section["text"], remaining)
+            return text, count_tokens(text)
+
+        used = count_tokens(section["text"]) + 1
+        kept: List[str] = []
+        for line in reversed(section["lines"]):
+            tokens = count_tokens(line) + 1
+            if used + tokens > remaining:
+                if not kept:
+                    # Keep the start of the newest line rather than losing the whole section.
+                    line = truncate_tokens(line, remaining - used - 1)
+                    if line:
+                        kept.append(line)
+                        used += count_tokens(line) + 1
+                break
+            kept.append(line)
+            used += tokens
+        if not kept:
+            return "", 0
+        kept.reverse()
+        return "\n".join([section["text"], *kept]), used
+
+    def build(self) -> str:
+        remaining = self.budget
+        rendered: Dict[int, str] = {}
+        for index in sorted(range(len(self._sections)), key=lambda i: -self._sections[i]["priority"]):
+            text, used = self._fit(self._sections[index], remaining)
+            rendered[index] = text
+            remaining -= used
+        return "\n\n".join(rendered[i] for i in range(len(self._sections)) if rendered[i])
+
+
+class ConversationSummarizer:
+    """
+    Maintains a running summary per session. The prompt gets the summary plus
+    the turns after it; once ``batch`` turns fall outside the ``keep_recent``
+    verbatim tail they are folded into the summary in the background.
+    """
+
+    def __init__(self, llm, format_message: Callable[[Dict], str], keep_recent: Optional[int] = None,
+                 batch: Optional[int] = None, max_summary_tokens: int = 250, service: str = "chatbot"):
+        self.llm = llm
+        self.service = service
+        self.format_message = format_message
+        self.keep_recent = keep_recent or int(os.getenv("PROMPT_RECENT_MESSAGES", "6"))
+        self.batch = batch or int(os.getenv("SUMMARY_BATCH_MESSAGES", "4"))
+        self.max_summary_tokens = max_summary_tokens
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="summary")
+
+    def context(self, session: Session) -> Tuple[str, List[Dict]]:
+        with session.lock:
+            return session.summary, session.since(session.summary_seq)
+
+    def _pending(self, session: Session) -> List[Dict]:
+        with session.lock:
+            messages = session.since(session.summary_seq)
+        return messages[:max(0, len(messages) - self.keep_recent)]
+
+    def refresh(self, session: Session) -> None:
+        pending = self._pending(session)
+        if len(pending) < self.batch or not session.summary_lock.acquire(blocking=False):
+            return
+        try:
+            pending = self._pending(session)
+            new_turns = "\n".join(self.format_message(m) for m in pending)
+            with span(self.service, "llm.summary"):
+                response = self.llm.invoke([
+                    SystemMessage(content="You maintain a concise running summary of a therapy conversation."),
+                    HumanMessage(content=(
+                        f"Current summary:\n{session.summary or '(none)'}\n\n"
+                        f"New turns:\n{new_turns}\n\n"
+                        f"Rewrite the summary in at most {self.max_summary_tokens} tokens, keeping the user's "
+                        "concerns, feelings, important facts and anything agreed on."
+                    ))
+                ])
+            with session.lock:
+                session.summary = response.content.strip()
+                session.summary_seq += len(pending)
+        except Exception as e:
+            print(f"Summarization error: {e}")
+        finally:
+            session.summary_lock.release()
+
+    def schedule(self, session: Session) -> None:
+        if len(self._pending(session)) >= self.batch:
+            self._executor.submit(in_context(self.refresh, session))
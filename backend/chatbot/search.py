@@ -0,0 +1,166 @@
+import atexit
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from chatbot.cache import TTLCache
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each few
+for from further had hadn't has hasn't have haven't having he he'd he'll he's her here here's hers herself him
+himself his how how's i i'd i'll i'm i've if in into is isn't it it's its itself let's me more most mustn't my
+myself no nor not of off on once only or other ought our ours ourselves out over own same shan't she she'd
+she'll she's should shouldn't so some such than that that's the their theirs them themselves then there there's
+these they they'd they'll they're they've this those through to too under until up very was wasn't we we'd
+we'll we're we've were weren't what what's when when's where where's which while who who's whom why why's with
+won't would wouldn't you you'd you'll you're you've your yours yourself yourselves
+im ive id dont cant wont didnt doesnt isnt wasnt
+just really actually maybe lot lots thing things something anything everything stuff kind sort pretty quite
+feel feeling felt think thought know knew want wanted get got getting go going went make made keep kept
+like wouldn't still even much many always never sometimes today yesterday lately recently right now day days
+yeah yes okay ok well hi hello hey please thanks thank
+""".split())
+
+_FRAGMENT_RE = re.compile(r"[.,;:!?()\[\]{}\"\n\t]+|\s[-–—]\s")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_MAX_PHRASE_WORDS = 4
+
+
+def _candidate_phrases(text: str) -> List[Tuple[str, ...]]:
+    phrases = []
+    for fragment in _FRAGMENT_RE.split(text.lower()):
+        phrase: List[str] = []
+        for word in _WORD_RE.findall(fragment):
+            if word in STOPWORDS or len(word) < 2:
+                if phrase:
+                    phrases.append(tuple(phrase))
+                phrase = []
+                continue
+            phrase.append(word)
+            if len(phrase) == _MAX_PHRASE_WORDS:
+                phrases.append(tuple(phrase))
+                phrase = []
+        if phrase:
+            phrases.append(tuple(phrase))
+    return phrases
+
+
+@lru_cache(maxsize=2048)
+def extract_search_query(text: str, max_length: int = 100) -> str:
+    """
+    Build a search query locally with RAKE-style keyphrase scoring: phrases are
+    runs of non-stopwords and each word scores degree / frequency.
+    """
+    phrases = _candidate_phrases(text)
+    if not phrases:
+        return text[:max_length].strip()
+
+    frequency: Dict[str, int] = defaultdict(int)
+    degree: Dict[str, int] = defaultdict(int)
+    for phrase in phrases:
+        for word in phrase:
+            frequency[word] += 1
+            degree[word] += len(phrase)
+
+    first_seen: Dict[Tuple[str, ...], int] = {}
+    for position, phrase in enumerate(phrases):
+        first_seen.setdefault(phrase, position)
+
+    ranked = sorted(
+        first_seen,
+        key=lambda p: (-sum(degree[w] / frequency[w] for w in p), first_seen[p])
+    )
+
+    selected = []
+    used_words = set()
+    length = 0
+    for phrase in ranked:
+        words = [w for w in phrase if w not in used_words]
+        if not words:
+            continue
+        candidate = " ".join(words)
+        added = len(candidate) + (1 if selected else 0)
+        if length + added > max_length:
+            continue
+        selected.append((first_seen[phrase], candidate))
+        used_words.update(words)
+        length += added
+
+    # Keep the user's word order so the query still reads naturally.
+    return " ".join(candidate for _, candidate in sorted(selected))
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace, stopword and word-order insensitive cache key for a query."""
+    words = {word for word in _WORD_RE.findall(query.lower()) if word not in STOPWORDS}
+    return " ".join(sorted(words)) if words else " ".join(query.lower().split())
+
+
+class SearchCache(TTLCache):
+    """
+    Search results keyed by normalized query, optionally persisted to a JSON
+    file so repeated topics survive restarts.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None,
+                 path: Optional[str] = None, save_interval: float = 30.0):
+        super().__init__(
+            max_entries=max_entries or int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "512")),
+            ttl=ttl or float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "21600"))
+        )
+        self.path = path or os.getenv("SEARCH_CACHE_PATH")
+        self.save_interval = save_interval
+        self._last_save = time.monotonic()
+        if self.path:
+            self.load()
+            atexit.register(self.save)
+
+    @staticmethod
+    def key(query: str, max_results: int) -> str:
+        return f"{max_results}:{normalize_query(query)}"
+
+    def get_results(self, query: str, max_results: int) -> Optional[List[Dict]]:
+        results = self.get(self.key(query, max_results))
+        # Copies, so a caller editing its results cannot change what later hits see.
+        return [dict(result) for result in results] if results is not None else None
+
+    def put_results(self, query: str, max_results: int, results: List[Dict]) -> None:
+        self.put(self.key(query, max_results), [dict(result) for result in results])
+        if self.path and time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"Ignoring unreadable search cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, results, expires_at in entries:
+            if expires_at > now:
+                self.put(key, results, ttl=expires_at - now)
+
+    def save(self) -> None:
+        now = time.time()
+        entries = [
+            [key, results, now + (remaining if remaining is not None else self.ttl)]
+            for key, results, remaining in self.snapshot()
+        ]
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving search cache: {e}")
+        self._last_save = time.monotonic()
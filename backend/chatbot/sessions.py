@@ -0,0 +1,136 @@
+import os
+import re
+import secrets
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi import Cookie, Header
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+
+from chatbot.cache import TTLCache
+from chatbot.history import DEFAULT_SESSION, HistoryStore
+
+
+class Session:
+    def __init__(self, session_id: str, messages: List[Dict], window: int):
+        self.session_id = session_id
+        self.messages: Deque[Dict] = deque(messages, maxlen=window)
+        self.lock = threading.Lock()
+        # Sequence number of the newest message, counted from when the session was loaded.
+        self.seq = len(self.messages)
+        self.summary = ""
+        self.summary_seq = 0
+        self.summary_lock = threading.Lock()
+
+    def append(self, record: Dict) -> None:
+        with self.lock:
+            self.messages.append(record)
+            self.seq += 1
+
+    def since(self, seq: int) -> List[Dict]:
+        """Messages newer than sequence number ``seq`` that are still held; call with ``lock`` held."""
+        skip = max(0, seq - (self.seq - len(self.messages)))
+        return list(islice(self.messages, skip, None))
+
+    def tail(self, n: int) -> List[Dict]:
+        if n <= 0:
+            return []
+        with self.lock:
+            recent = list(islice(reversed(self.messages), n))
+        recent.reverse()
+        return recent
+
+
+class SessionManager:
+    """
+    Keeps the hot tail of each conversation in a bounded LRU/TTL cache and
+    lazily reloads evicted sessions from the history store.
+    """
+
+    def __init__(self, store: HistoryStore, max_sessions: Optional[int] = None,
+                 ttl: Optional[float] = None, window: Optional[int] = None):
+        self.store = store
+        self.window = window or int(os.getenv("SESSION_WINDOW", "20"))
+        self._sessions = TTLCache(
+            max_entries=max_sessions or int(os.getenv("SESSION_MAX_ACTIVE", "1000")),
+            ttl=ttl or float(os.getenv("SESSION_TTL_SECONDS", "1800")),
+            sliding=True
+        )
+        self._load_lock = threading.Lock()
+
+    def get(self, session_id: str) -> Session:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+
+        with self._load_lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id, self.store.recent(session_id, self.window), self.window)
+                self._sessions.put(session_id, session)
+            return session
+
+    def append(self, session_id: str, record: Dict) -> None:
+        self.get(session_id).append(record)
+        self.store.append(session_id, record)
+
+    def recent(self, session_id: str, n: int) -> List[Dict]:
+        return self.get(session_id).tail(min(n, self.window))
+
+    def stats(self) -> Dict:
+        return self._sessions.stats()
+
+
+SESSION_COOKIE = "session_id"
+SESSION_COOKIE_MAX_AGE = int(os.getenv("SESSION_COOKIE_MAX_AGE", str(30 * 86400)))
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "0").lower() in ("1", "true", "yes")
+# Ids we issue (token_urlsafe) and the frontend's UUIDs; short or reserved ids could be guessed.
+_SESSION_ID_RE = re.compile(r"[A-Za-z0-9_-]{16,128}")
+RESERVED_SESSION_IDS = frozenset({DEFAULT_SESSION})
+
+
+def valid_session_id(session_id: Optional[str]) -> bool:
+    return (session_id is not None and session_id not in RESERVED_SESSION_IDS
+            and _SESSION_ID_RE.fullmatch(session_id) is not None)
+
+
+def resolve_session_id(connection: HTTPConnection, x_session_id: Optional[str] = Header(None),
+                       session_id: Optional[str] = Cookie(None)) -> str:
+    """
+    The caller's X-Session-ID header or session cookie. A caller with neither,
+    or with an id that is too short or reserved (legacy history is migrated
+    into ``DEFAULT_SESSION``), gets a new random id, which
+    ``issue_session_cookie`` (or the WebSocket handshake) sends back so the
+    next request resumes the same conversation.
+    """
+    for resolved in (x_session_id, session_id):
+        if valid_session_id(resolved):
+            return resolved
+
+    issued = getattr(connection.state, "issued_session_id", None)
+    if issued is None:
+        issued = secrets.token_urlsafe(18)
+        connection.state.issued_session_id = issued
+    return issued
+
+
+def session_headers(connection: HTTPConnection) -> List[Tuple[bytes, bytes]]:
+    """Set-Cookie and X-Session-ID headers for an id ``resolve_session_id`` issued, if any."""
+    issued = getattr(connection.state, "issued_session_id", None)
+    if issued is None:
+        return []
+    response = Response()
+    response.set_cookie(SESSION_COOKIE, issued, max_age=SESSION_COOKIE_MAX_AGE, httponly=True,
+                        samesite="lax", secure=SESSION_COOKIE_SECURE)
+    response.headers["X-Session-ID"] = issued
+    return [(name, value) for name, value in response.headers.raw if name != b"content-length"]
+
+
+async def issue_session_cookie(request, call_next):
+    """HTTP middleware: attach the session cookie when the request was given a new session id."""
+    response = await call_next(request)
+    response.headers.raw.extend(session_headers(request))
+    return response
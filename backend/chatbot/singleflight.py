@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution whose
+    result (or exception) is handed to every caller. Nothing is cached once
+    the call finishes; pair it with a cache for that.
+
+    ``do`` is for blocking callers on worker threads, ``ado`` for coroutines.
+    An async caller that is cancelled only stops waiting; the shared task is
+    cancelled once no caller is left waiting on it.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.cancelled = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None or flight.abandoned:
+                flight = self._flights[key] = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+                flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finish(key, flight))
+                self.executions += 1
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+                self.cancelled += 1
+
+    def _finish(self, key: Hashable, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        calls = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls) + len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "coalesced_rate": self.coalesced / calls if calls else 0.0
+        }
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, Iterator, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+# Deepgram encodes these natively, so compressed output needs no local transcoding.
+AUDIO_FORMATS: Dict[str, Dict] = {
+    "pcm": {"media_type": "audio/L16", "encoding": "linear16", "container": "none"},
+    "wav": {"media_type": "audio/wav", "encoding": "linear16", "container": "wav"},
+    "mp3": {"media_type": "audio/mpeg", "encoding": "mp3", "container": None},
+    "opus": {"media_type": "audio/ogg", "encoding": "opus", "container": "ogg"},
+}
+
+_ACCEPT_FORMATS = {
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+    "audio/wave": "wav",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+}
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+CHUNK_SIZE = 64 * 1024
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str], default: str = "wav") -> str:
+    """Pick an output format from an explicit ``format`` parameter, then the Accept header."""
+    if requested in AUDIO_FORMATS and requested != "pcm":
+        return requested
+
+    best, best_q = default, 0.0
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        audio_format = _ACCEPT_FORMATS.get(media_type.lower())
+        if not audio_format:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = audio_format, q
+    return best
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single-range ``Range`` header; ValueError if unsatisfiable."""
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        if last and int(last) < start:
+            # An invalid range-spec, which is ignored rather than refused (RFC 9110 14.2).
+            return None
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def iter_chunks(data: bytes, start: int = 0, end: Optional[int] = None,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    view = memoryview(data)
+    end = len(data) if end is None else end
+    for offset in range(start, end, chunk_size):
+        yield bytes(view[offset:min(offset + chunk_size, end)])
+
+
+def build_audio_response(data: bytes, audio_format: str, range_header: Optional[str] = None,
+                   headers: Optional[Dict[str, str]] = None) -> Response:
+    """Fixed-size chunked audio body with Content-Length and single-range support."""
+    size = len(data)
+    headers = {"Accept-Ranges": "bytes", "Vary": "Accept", **(headers or {})}
+    media_type = AUDIO_FORMATS[audio_format]["media_type"]
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_chunks(data), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(iter_chunks(data, start, end + 1), status_code=206, media_type=media_type,
+                             headers=headers)
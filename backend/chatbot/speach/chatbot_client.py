@@ -1,13 +1,30 @@
+import asyncio
+import hashlib
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import TypedDict, Optional, Dict, List
+from typing import TypedDict, Optional, Dict, Iterator, List, Tuple, Union
 import os
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage, HumanMessage
-from langchain_openai import ChatOpenAI
-from deepface import DeepFace
-from deepgram import DeepgramClient, SpeakOptions, PrerecordedOptions
+from deepgram import SpeakOptions, PrerecordedOptions
 import json
+import numpy as np
+
+from chatbot.cache import DiskCache, TTLCache, file_digest
+from chatbot.clients import clients
+from chatbot.history import DEFAULT_SESSION, get_history_store
+from chatbot.memory import MemoryStore
+from chatbot.prompt import ConversationSummarizer, PromptBuilder
+from chatbot.sessions import SessionManager
+from chatbot.singleflight import SingleFlight
+from chatbot.telemetry import count_bytes, current_trace_id, span, stats_samples, trace
+from chatbot.speach.audio_delivery import AUDIO_FORMATS
+from chatbot.speach.emotion import EmotionAnalyzer
+from chatbot.speach.emotion_pool import EmotionPoolUnavailable, EmotionWorkerPool
+from chatbot.speach.emotion_tracker import EmotionTracker
+from chatbot.speach.face_preprocess import FacePreprocessor
+from chatbot.speach.streaming import pipeline_tts, streaming_wav_header
 
 load_dotenv()
 
@@ -31,6 +48,12 @@ Important: If you detect signs of immediate crisis or harm, provide crisis hotli
 
 Current emotional context will be provided with each interaction to help you tailor your response appropriately."""
 
+QUERY_INSTRUCTIONS = """Please provide a therapeutic response that:
+1. Acknowledges the user's emotional state
+2. Addresses their query
+3. References previous conversation when relevant
+4. Maintains a supportive and empathetic tone"""
+
 
 class ChatMessage(TypedDict):
     speaker: str
@@ -40,25 +63,87 @@ class ChatMessage(TypedDict):
 
 class DeepgramTTS:
     def __init__(self):
-        self.filename = "response.wav"
-        self.deepgram = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"))
+        self.model = "aura-asteria-en"
+        self.sample_rate = 16000
+        self.deepgram = clients.deepgram()
+        self.transport = clients.transport("deepgram")
+        # Off unless TTS_CACHE_DIR is set: cached replies are therapy content stored in plaintext.
+        cache_dir = os.getenv("TTS_CACHE_DIR")
+        self.cache = DiskCache(
+            cache_dir, int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        ) if cache_dir else None
+        self.flight = SingleFlight()
+
+    def cache_key(self, text: str, audio_format: str) -> str:
+        normalized = " ".join(text.split())
+        spec = AUDIO_FORMATS[audio_format]
+        key = f"{self.model}|{spec['encoding']}|{spec['container']}|{self.sample_rate}|{normalized}"
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=20).hexdigest()
+
+    def _options(self, audio_format: str) -> SpeakOptions:
+        spec = AUDIO_FORMATS[audio_format]
+        options = {"model": self.model, "encoding": spec["encoding"]}
+        if spec["container"]:
+            options["container"] = spec["container"]
+        if spec["encoding"] == "linear16":
+            # Deepgram fixes the rate for compressed encodings
+            options["sample_rate"] = self.sample_rate
+        return SpeakOptions(**options)
+
+    def _fetch(self, key: str, text: str, audio_format: str) -> bytes:
+        with span("voice", "tts.upstream"):
+            response = self.deepgram.speak.rest.v("1").stream_memory(
+                {"text": text}, self._options(audio_format), transport=self.transport
+            )
+            audio = response.stream_memory.getvalue()
+        count_bytes("voice", "in", "tts_audio", len(audio))
+        if self.cache:
+            self.cache.put(key, audio)
+        return audio
 
-    def speak(self, text: str) -> Optional[str]:
+    def _synthesize(self, text: str, audio_format: str) -> Optional[bytes]:
         try:
-            options = SpeakOptions(
-                model="aura-asteria-en",
-                encoding="linear16",
-                container="wav",
-                sample_rate=16000
-            )
+            key = self.cache_key(text, audio_format)
+            if self.cache:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+
+            # Retries and concurrent turns with the same text share one Deepgram request.
+            return self.flight.do(key, self._fetch, key, text, audio_format)
+
+        except Exception as e:
+            print(f"TTS Exception: {e}")
+            return None
 
-            SPEAK_OPTIONS = {"text": text}
-            temp_dir = tempfile.mkdtemp()
-            output_path = os.path.join(temp_dir, self.filename)
+    def synthesize(self, text: str) -> Optional[bytes]:
+        """Raw linear16 PCM for ``text``, without a WAV container."""
+        return self._synthesize(text, "pcm")
 
-            self.deepgram.speak.v("1").save(output_path, SPEAK_OPTIONS, options)
+    def speak_bytes(self, text: str, audio_format: str = "wav") -> Optional[bytes]:
+        """Audio for ``text`` (wav, mp3 or opus) returned in memory, without a temp file."""
+        return self._synthesize(text, audio_format)
 
-            return output_path
+    def speak(self, text: str) -> Optional[str]:
+        """
+        Path of a WAV file for ``text``. With the cache on it is the cache
+        entry; without it, a temp file that the caller deletes when done.
+        """
+        try:
+            key = self.cache_key(text, "wav")
+            if self.cache is None:
+                audio = self.flight.do(key, self._fetch, key, text, "wav")
+                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+                    f.write(audio)
+                return f.name
+
+            cached_path = self.cache.path_for(key)
+            if cached_path:
+                return cached_path
+
+            audio = self.flight.do(key, self._fetch, key, text, "wav")
+            # _fetch stored it; the lookup above already counted this miss.
+            return self.cache.path_for(key, count=False) or self.cache.put(key, audio)
 
         except Exception as e:
             print(f"TTS Exception: {e}")
@@ -67,76 +152,183 @@ class DeepgramTTS:
 
 class SpeechToText:
     def __init__(self):
-        self.deepgram = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"))
+        self.deepgram = clients.deepgram()
+        self.transport = clients.transport("deepgram")
 
-    def transcribe_file(self, file_path: str) -> Optional[str]:
+    def transcribe_bytes(self, audio: Union[bytes, memoryview], mimetype: str = 'audio/wav') -> Optional[str]:
         try:
-            with open(file_path, 'rb') as audio:
-                source = {
-                    'buffer': audio,
-                    'mimetype': 'audio/wav'
-                }
+            source = {
+                'buffer': audio,
+                'mimetype': mimetype
+            }
 
-                options = PrerecordedOptions(
-                    model="nova-2",
-                    smart_format=True,
-                    language="en-US",
-                    punctuate=True
-                )
+            options = PrerecordedOptions(
+                model="nova-2",
+                smart_format=True,
+                language="en-US",
+                punctuate=True
+            )
 
-                response = self.deepgram.listen.rest.v("1").transcribe_file(source, options)
-                return response.results.channels[0].alternatives[0].transcript
+            count_bytes("voice", "out", "stt_audio", len(audio))
+            with span("voice", "stt.upstream"):
+                response = self.deepgram.listen.rest.v("1").transcribe_file(source, options, transport=self.transport)
+            return response.results.channels[0].alternatives[0].transcript
 
         except Exception as e:
             print(f"Transcription error: {e}")
             return None
 
+    def transcribe_file(self, file_path: str) -> Optional[str]:
+        try:
+            with open(file_path, 'rb') as audio:
+                return self.transcribe_bytes(audio.read())
+        except OSError as e:
+            print(f"Transcription error: {e}")
+            return None
+
 
 class EmotionAwareBot:
     def __init__(self):
-        self.openai = ChatOpenAI(model="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY"))
-        self.deepgram = DeepgramClient(api_key=os.getenv("DEEPGRAM_API_KEY"))
+        self.openai = clients.chat_model("gpt-4o-mini")
+        self.deepgram = clients.deepgram()
         self.tts = DeepgramTTS()
         self.stt = SpeechToText()
-        self.conversation_history: List[ChatMessage] = []
-
-        # Load history
-        try:
-            with open("chat_history.json", "r", encoding="utf-8") as f:
-                self.conversation_history = json.load(f)
-        except FileNotFoundError:
-            self.conversation_history = []
-
-    def save_to_history(self, speaker: str, message: str) -> None:
+        self.emotion_analyzer = EmotionAnalyzer()
+        self.emotion_pool = EmotionWorkerPool() if int(os.getenv("EMOTION_WORKERS", "1")) > 0 else None
+        self.face_preprocessor = FacePreprocessor()
+        self.face_cache = TTLCache(max_entries=int(os.getenv("FACE_CACHE_ENTRIES", "4096")))
+        # Identical images submitted concurrently are analyzed once.
+        self.face_flight = SingleFlight()
+        self.emotion_tracker = EmotionTracker()
+        face_cache_dir = os.getenv("FACE_CACHE_DIR")
+        self.face_disk_cache = DiskCache(
+            face_cache_dir, int(os.getenv("FACE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        ) if face_cache_dir else None
+        self.history = get_history_store()
+        self.sessions = SessionManager(self.history)
+        self.prompt_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+        self.summarizer = ConversationSummarizer(self.openai, self._format_message, service="voice")
+        self.memory = MemoryStore(self.history, self._format_message)
+        self._tts_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("TTS_PIPELINE_WORKERS", "4")), thread_name_prefix="tts"
+        )
+
+    def save_to_history(self, speaker: str, message: str, session_id: str = DEFAULT_SESSION) -> None:
         new_message: ChatMessage = {
             "speaker": speaker,
             "message": message,
             "timestamp": datetime.now().isoformat()
         }
 
-        self.conversation_history.append(new_message)
-
         try:
-            with open("chat_history.json", "w", encoding="utf-8") as file:
-                json.dump(
-                    self.conversation_history,
-                    file,
-                    ensure_ascii=False,
-                    indent=2
-                )
+            # Memory first: a cold index is rebuilt from history, which must not yet hold this record.
+            with span("voice", "memory.add"):
+                self.memory.add(session_id, new_message)
+            with span("voice", "history.append"):
+                self.sessions.append(session_id, new_message)
         except Exception as e:
             print(f"Error saving chat history: {e}")
 
-    def get_conversation_context(self, last_n: int = 5) -> List[ChatMessage]:
-        return self.conversation_history[-last_n:] if self.conversation_history else []
+    def get_conversation_context(self, last_n: int = 5, session_id: str = DEFAULT_SESSION) -> List[ChatMessage]:
+        return self.sessions.recent(session_id, last_n)
 
-    def analyze_image(self, image_path: str) -> Dict:
+    @staticmethod
+    def _face_summary(result: List[Dict]) -> Dict:
+        return {
+            'emotion': result[0]['dominant_emotion'],
+            'gender': result[0]['gender'],
+        }
+
+    def _image_key(self, image_path: str) -> str:
+        # Results depend on the analyzer configuration as well as the image bytes.
+        analyzer = self.emotion_analyzer
+        with span("voice", "face.hash"):
+            return file_digest(image_path, salt=f"{','.join(analyzer.actions)}|{analyzer.detector_backend}|"
+                                               f"{self.face_preprocessor.settings()}")
+
+    def _cached_analysis(self, key: str) -> Optional[Dict]:
+        analysis = self.face_cache.get(key)
+        if analysis is None and self.face_disk_cache:
+            data = self.face_disk_cache.get(key)
+            if data:
+                analysis = json.loads(data)
+                self.face_cache.put(key, analysis)
+        return analysis
+
+    def _store_analysis(self, key: str, analysis: Dict) -> None:
+        self.face_cache.put(key, analysis)
+        if self.face_disk_cache:
+            # DeepFace scores are numpy floats
+            self.face_disk_cache.put(key, json.dumps(analysis, default=float).encode("utf-8"))
+
+    def face_cache_stats(self) -> Dict:
+        return {
+            "memory": self.face_cache.stats(),
+            "disk": self.face_disk_cache.stats() if self.face_disk_cache else None
+        }
+
+    def coalescing_stats(self) -> Dict:
+        return {
+            "tts": self.tts.flight.stats(),
+            "face_analysis": self.face_flight.stats()
+        }
+
+    def metric_samples(self) -> List:
+        labels = {"service": "voice"}
+        samples = (
+            stats_samples("chatbot_cache", {**labels, "cache": "face"}, self.face_cache.stats())
+            + stats_samples("chatbot_cache", {**labels, "cache": "sessions"}, self.sessions.stats())
+        )
+        if self.face_disk_cache:
+            samples += stats_samples("chatbot_cache", {**labels, "cache": "face_disk"}, self.face_disk_cache.stats())
+        if self.tts.cache:
+            samples += stats_samples("chatbot_cache", {**labels, "cache": "tts_disk"}, self.tts.cache.stats())
+        for call, stats in self.coalescing_stats().items():
+            samples += stats_samples("chatbot_coalescing", {**labels, "call": call}, stats)
+        face = self.face_preprocessor.stats()
+        samples += [
+            ("chatbot_face_crops_total", "counter", labels, face["crops"]),
+            ("chatbot_face_crop_misses_total", "counter", labels, face["crop_misses"])
+        ]
+        return samples
+
+    async def _aanalyze_prepared(self, image: Union[str, np.ndarray], session_id: Optional[str]) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        preprocessor = self.face_preprocessor
+        with span("voice", "face.preprocess"):
+            # Only the decoded, downscaled array crosses to the worker process.
+            prepared = await loop.run_in_executor(None, preprocessor.prepare, image, session_id)
+        with span("voice", "face.analyze"):
+            try:
+                result = await self.emotion_pool.analyze(prepared.image)
+            except ValueError:
+                # Same fallback as FacePreprocessor.analyze, with inference in the pool.
+                if not prepared.cropped:
+                    raise
+                prepared = await loop.run_in_executor(None, preprocessor.full_frame, image)
+                result = await self.emotion_pool.analyze(prepared.image)
+        preprocessor.remember(session_id, prepared, result)
+        return result
+
+    def _analyze_uncached(self, key: str, image_path: str, session_id: Optional[str] = None) -> Dict:
+        analysis = self._face_summary(
+            self.face_preprocessor.analyze(self.emotion_analyzer.analyze, image_path, session_id)
+        )
+        self._store_analysis(key, analysis)
+        return analysis
+
+    async def _aanalyze_uncached(self, key: str, image_path: str, session_id: Optional[str] = None) -> Dict:
+        analysis = self._face_summary(await self._aanalyze_prepared(image_path, session_id))
+        self._store_analysis(key, analysis)
+        return analysis
+
+    def analyze_image(self, image_path: str, session_id: Optional[str] = None) -> Dict:
         try:
-            result = DeepFace.analyze(image_path, actions=['emotion', 'gender'])
-            return {
-                'emotion': result[0]['dominant_emotion'],
-                'gender': result[0]['gender'],
-            }
+            key = self._image_key(image_path)
+            analysis = self._cached_analysis(key)
+            if analysis is None:
+                analysis = self.face_flight.do(key, self._analyze_uncached, key, image_path, session_id)
+            return analysis
         except Exception as e:
             print(f"Error in face analysis: {e}")
             return {
@@ -144,58 +336,119 @@ class EmotionAwareBot:
                 'gender': None,
             }
 
-    def process_query(self, text_query: str, emotion_context: str) -> str:
-        recent_conversation = self.get_conversation_context()
-        conversation_context = "\n".join([
-            f"{msg['speaker']}: {msg['message']}"
-            for msg in recent_conversation
-        ])
-
-        prompt = f"""
-        {THERAPIST_SYSTEM_PROMPT}
-
-        Current Context:
-        - User's emotional state: {emotion_context}
-        - User's query: {text_query}
+    async def aanalyze_image(self, image_path: str, session_id: Optional[str] = None) -> Dict:
+        """Face analysis for async endpoints, run in the worker pool when one is configured."""
+        loop = asyncio.get_running_loop()
+        if self.emotion_pool is None:
+            return await loop.run_in_executor(None, self.analyze_image, image_path, session_id)
 
-        Conversation History:
-        {conversation_context}
-
-        Please provide a therapeutic response that:
-        1. Acknowledges the user's emotional state
-        2. Addresses their query
-        3. References previous conversation when relevant
-        4. Maintains a supportive and empathetic tone
-        """
+        try:
+            key = await loop.run_in_executor(None, self._image_key, image_path)
+            analysis = self._cached_analysis(key)
+            if analysis is None:
+                analysis = await self.face_flight.ado(key, self._aanalyze_uncached, key, image_path, session_id)
+            return analysis
+        except EmotionPoolUnavailable:
+            # Not a property of the image; a "neutral" default would hide the outage.
+            raise
+        except Exception as e:
+            print(f"Error in face analysis: {e}")
+            return {
+                'emotion': 'neutral',
+                'gender': None,
+            }
 
-        response = self.openai.invoke([
+    async def analyze_frame(self, frame: np.ndarray, session_id: Optional[str] = None) -> List[Dict]:
+        if self.emotion_pool is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.face_preprocessor.analyze, self.emotion_analyzer.analyze, frame, session_id
+            )
+        return await self._aanalyze_prepared(frame, session_id)
+
+    def _query_messages(self, text_query: str, emotion_context: str, session_id: str) -> List:
+        with span("voice", "prompt"):
+            return self._build_query_messages(text_query, emotion_context, session_id)
+
+    def _build_query_messages(self, text_query: str, emotion_context: str, session_id: str) -> List:
+        summary, recent = self.summarizer.context(self.sessions.get(session_id))
+        with span("voice", "memory.search"):
+            memories = self.memory.relevant(session_id, text_query, exclude_last=len(recent))
+
+        prompt = (
+            PromptBuilder(self.prompt_budget)
+            .reserve(THERAPIST_SYSTEM_PROMPT)
+            .add(f"Current Context:\n- User's emotional state: {emotion_context}\n- User's query: {text_query}",
+                 priority=3)
+            .add(f"Summary of earlier conversation:\n{summary}" if summary else "", priority=1)
+            .add_lines("Relevant earlier conversation:", memories, priority=1)
+            .add_lines("Conversation History:", [self._format_message(m) for m in recent], priority=2)
+            .add(QUERY_INSTRUCTIONS, priority=4)
+            .build()
+        )
+        return [
             SystemMessage(content=THERAPIST_SYSTEM_PROMPT),
             HumanMessage(content=prompt)
-        ])
+        ]
+
+    @staticmethod
+    def _format_message(message: ChatMessage) -> str:
+        # The text service shares the history store and writes "role" instead of "speaker".
+        return f"{message.get('speaker') or message.get('role')}: {message['message']}"
+
+    def process_query(self, text_query: str, emotion_context: str, session_id: str = DEFAULT_SESSION) -> str:
+        messages = self._query_messages(text_query, emotion_context, session_id)
+        with span("voice", "llm"):
+            response = self.openai.invoke(messages)
 
         response_text = response.content
-        self.save_to_history("Assistant", response_text)
+        self.save_to_history("Assistant", response_text, session_id)
+        self.summarizer.schedule(self.sessions.get(session_id))
 
         return response_text
 
-    def process_interaction(self, image_path: Optional[str] = None, text_query: Optional[str] = None) -> Dict:
+    def stream_query(self, text_query: str, emotion_context: str, session_id: str = DEFAULT_SESSION,
+                     chunks: Optional[List[str]] = None) -> Iterator[str]:
+        chunks = [] if chunks is None else chunks
+        messages = self._query_messages(text_query, emotion_context, session_id)
+        with span("voice", "llm.stream"):
+            for chunk in self.openai.stream(messages):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+
+        response_text = "".join(chunks)
+        print(f"AI response: {response_text}")
+        self.save_to_history("Assistant", response_text, session_id)
+        self.summarizer.schedule(self.sessions.get(session_id))
+
+    def _answer(self, text_query: str, image_path: Optional[str], session_id: str) -> Tuple[str, Dict]:
         analysis_result = {
             'emotion': 'neutral',
             'gender': None
         }
 
         if image_path:
-            analysis_result = self.analyze_image(image_path)
+            analysis_result = self.analyze_image(image_path, session_id)
             print(f"Face analysis results: {analysis_result}")
+        else:
+            analysis_result['emotion'] = self.emotion_tracker.current_emotion(session_id) or 'neutral'
 
-        if text_query:
-            self.save_to_history("User", text_query)
+        self.save_to_history("User", text_query, session_id)
+
+        response_text = self.process_query(text_query, analysis_result['emotion'], session_id)
+        print(f"User query: {text_query}")
+        print(f"AI response: {response_text}")
+
+        return response_text, analysis_result
 
-            response_text = self.process_query(text_query, analysis_result['emotion'])
-            print(f"User query: {text_query}")
-            print(f"AI response: {response_text}")
+    def process_interaction(self, image_path: Optional[str] = None, text_query: Optional[str] = None,
+                            session_id: str = DEFAULT_SESSION) -> Dict:
+        if text_query:
+            with span("voice", "turn"):
+                response_text, analysis_result = self._answer(text_query, image_path, session_id)
 
-            audio_file = self.tts.speak(response_text)
+            with span("voice", "tts"):
+                audio_file = self.tts.speak(response_text)
             return {
                 "text_response": response_text,
                 "audio_response": audio_file,
@@ -204,13 +457,67 @@ class EmotionAwareBot:
 
         return {"error": "No query provided"}
 
-    def process_audio_file(self, audio_path: str, image_path: Optional[str] = None) -> Dict:
-        text_query = self.stt.transcribe_file(audio_path)
+    def stream_interaction(self, text_query: str, image_path: Optional[str] = None,
+                           session_id: str = DEFAULT_SESSION, reply: Optional[List[str]] = None) -> Iterator[bytes]:
+        """
+        Stream the spoken response as WAV: each sentence is synthesized as soon
+        as the LLM finishes it, so audio starts after roughly one sentence
+        instead of after the whole answer. ``reply`` collects this turn's
+        response text as it is generated.
+        """
+        emotion = self.emotion_tracker.current_emotion(session_id) or 'neutral'
+        if image_path:
+            analysis_result = self.analyze_image(image_path, session_id)
+            print(f"Face analysis results: {analysis_result}")
+            emotion = analysis_result['emotion']
+
+        self.save_to_history("User", text_query, session_id)
+        print(f"User query: {text_query}")
+
+        trace_id = current_trace_id()
+
+        def synthesize(sentence: str) -> Optional[bytes]:
+            # Runs on the TTS executor, which does not inherit the request's context.
+            with trace(trace_id), span("voice", "tts"):
+                return self.tts.synthesize(sentence)
+
+        yield streaming_wav_header(sample_rate=self.tts.sample_rate)
+        yield from pipeline_tts(
+            self.stream_query(text_query, emotion, session_id, reply),
+            synthesize,
+            self._tts_executor
+        )
+
+    def process_audio_file(self, audio_path: str, image_path: Optional[str] = None,
+                           session_id: str = DEFAULT_SESSION) -> Dict:
+        with span("voice", "stt"):
+            text_query = self.stt.transcribe_file(audio_path)
 
         if text_query:
             print(f"Transcribed text: {text_query}")
             return self.process_interaction(
                 image_path=image_path,
-                text_query=text_query
+                text_query=text_query,
+                session_id=session_id
             )
-        return {"error": "Failed to transcribe audio"}
\ No newline at end of file
+        return {"error": "Failed to transcribe audio"}
+
+    def process_audio_bytes(self, audio: Union[bytes, memoryview], image_path: Optional[str] = None,
+                            session_id: str = DEFAULT_SESSION, audio_format: str = "wav") -> Dict:
+        """Same as process_audio_file, but audio goes in and comes out as bytes."""
+        with span("voice", "stt"):
+            text_query = self.stt.transcribe_bytes(audio)
+
+        if text_query:
+            print(f"Transcribed text: {text_query}")
+            with span("voice", "turn"):
+                response_text, analysis_result = self._answer(text_query, image_path, session_id)
+            with span("voice", "tts"):
+                audio_response = self.tts.speak_bytes(response_text, audio_format)
+            return {
+                "text_response": response_text,
+                "audio_response": audio_response,
+                "audio_key": self.tts.cache_key(response_text, audio_format) if self.tts.cache else None,
+                "face_analysis": analysis_result
+            }
+        return {"error": "Failed to transcribe audio"}
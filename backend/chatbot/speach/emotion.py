@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from chatbot.speach.face_preprocess import validate_detector
+
+_ACTION_MODELS = {"emotion": "Emotion", "gender": "Gender", "age": "Age", "race": "Race"}
+
+
+def synthetic_face(size: int = 224) -> np.ndarray:
+    """Bundled warm-up image: a shaded face-like oval on a gray background (BGR)."""
+    y, x = np.mgrid[:size, :size].astype(np.float32) / size
+    image = np.full((size, size, 3), 96, dtype=np.uint8)
+    oval = ((x - 0.5) / 0.32) ** 2 + ((y - 0.52) / 0.42) ** 2 <= 1.0
+    shade = (170 + 50 * (1 - y)).astype(np.uint8)
+    image[oval] = np.stack([shade, shade + 10, shade + 30], axis=-1)[oval]
+    for eye_x in (0.38, 0.62):
+        eye = ((x - eye_x) / 0.05) ** 2 + ((y - 0.42) / 0.03) ** 2 <= 1.0
+        image[eye] = 40
+    mouth = ((x - 0.5) / 0.12) ** 2 + ((y - 0.7) / 0.025) ** 2 <= 1.0
+    image[mouth] = 60
+    return image
+
+
+def _deepface():
+    # DeepFace pulls in TensorFlow; importing it on first use keeps app startup fast.
+    from deepface import DeepFace
+
+    return DeepFace
+
+
+def _build_model(model_name: str):
+    DeepFace = _deepface()
+    try:
+        return DeepFace.build_model(model_name=model_name, task="facial_attribute")
+    except TypeError:
+        # deepface < 0.0.90 has no ``task`` argument
+        return DeepFace.build_model(model_name)
+
+
+class EmotionAnalyzer:
+    """
+    Owns the DeepFace attribute models and face detector for the process. They
+    are built and exercised once by ``load`` so requests never pay the
+    TensorFlow graph construction and weight loading.
+    """
+
+    def __init__(self, actions: Optional[Sequence[str]] = None, detector_backend: Optional[str] = None):
+        self.actions = list(actions or os.getenv("DEEPFACE_ACTIONS", "emotion,gender").split(","))
+        self.detector_backend = validate_detector(detector_backend or os.getenv("DEEPFACE_DETECTOR", "opencv"))
+        self.ready = False
+        self.load_time: Optional[float] = None
+        self.models: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            if self.ready:
+                return
+
+            start = time.perf_counter()
+            for action in self.actions:
+                self.models[action] = _build_model(_ACTION_MODELS[action])
+
+            # Runs the detector and every attribute model once so lazy graph
+            # building happens here rather than in the first request.
+            _deepface().analyze(
+                synthetic_face(),
+                actions=self.actions,
+                detector_backend=self.detector_backend,
+                enforce_detection=False,
+                silent=True
+            )
+
+            self.load_time = time.perf_counter() - start
+            self.ready = True
+            print(f"Emotion models loaded in {self.load_time:.2f}s "
+                  f"(actions={self.actions}, detector={self.detector_backend})")
+
+    def analyze(self, image: Union[str, np.ndarray]) -> List[Dict]:
+        if not self.ready:
+            self.load()
+        return _deepface().analyze(image, actions=self.actions, detector_backend=self.detector_backend, silent=True)
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "load_seconds": self.load_time,
+            "actions": self.actions,
+            "detector_backend": self.detector_backend
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from chatbot.speach.emotion import EmotionAnalyzer
+
+_worker_analyzer: Optional[EmotionAnalyzer] = None
+
+
+def _init_worker(actions: Sequence[str], detector_backend: str) -> None:
+    global _worker_analyzer
+    _worker_analyzer = EmotionAnalyzer(actions, detector_backend)
+    _worker_analyzer.load()
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _analyze_batch(images: List[Union[str, np.ndarray]]) -> List[Tuple[bool, object]]:
+    # DeepFace.analyze takes one image at a time, so a batch is one task and one
+    # round trip to a worker whose models are already warm.
+    results = []
+    for image in images:
+        try:
+            results.append((True, _worker_analyzer.analyze(image)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+
+class EmotionPoolUnavailable(RuntimeError):
+    """The worker processes could not be started or died, so there is nothing to analyze with."""
+
+
+class EmotionWorkerPool:
+    """
+    Runs face analysis in dedicated worker processes that each keep the models
+    loaded, so DeepFace never blocks the event loop. Requests that arrive
+    within ``max_wait_ms`` of each other are grouped into one batch of up to
+    ``max_batch_size`` images.
+
+    The workers are started by the warm-up task, or by the first ``analyze``
+    if warm-up is disabled or has not finished. If a worker dies the pool is
+    marked not ready, the requests in flight fail with
+    ``EmotionPoolUnavailable``, and the next ``analyze`` starts new workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_batch_size: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None, actions: Optional[Sequence[str]] = None,
+                 detector_backend: Optional[str] = None):
+        self.workers = workers or int(os.getenv("EMOTION_WORKERS", "1"))
+        self.max_batch_size = max_batch_size or int(os.getenv("EMOTION_MAX_BATCH", "8"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("EMOTION_MAX_WAIT_MS", "5"))) / 1000
+        # Resolved and validated here so a bad DEEPFACE_DETECTOR fails at startup, not in a worker.
+        analyzer = EmotionAnalyzer(actions, detector_backend)
+        self._analyzer_args = (analyzer.actions, analyzer.detector_backend)
+        self.ready = False
+        self.load_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self.batches = 0
+        self.batched_requests = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the workers and wait until their models are loaded; a no-op once ready."""
+        with self._start_lock:
+            if self.ready:
+                return
+
+            start = time.perf_counter()
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # TensorFlow is not fork-safe once initialised in the parent.
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self._analyzer_args
+            )
+            try:
+                # The initializer loads the models before a worker runs its first task.
+                pids = {f.result() for f in [executor.submit(_worker_ready) for _ in range(self.workers)]}
+            except Exception as e:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.error = str(e) or type(e).__name__
+                raise EmotionPoolUnavailable(f"Emotion worker pool failed to start: {self.error}") from e
+
+            self._executor = executor
+            self.load_time = time.perf_counter() - start
+            self.error = None
+            self.ready = True
+            print(f"Emotion worker pool ready in {self.load_time:.2f}s ({len(pids)} of {self.workers} workers warm)")
+
+    async def analyze(self, image: Union[str, np.ndarray]) -> List[Dict]:
+        if not self.ready:
+            # Never dispatch without workers: the default executor has no models loaded.
+            await asyncio.to_thread(self.start)
+        if self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._collect_batches())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _collect_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            asyncio.create_task(self._dispatch(batch))
+
+    def _discard_broken(self, executor: ProcessPoolExecutor, error: BaseException) -> None:
+        with self._start_lock:
+            if self._executor is not executor:
+                # Another batch already saw the breakage.
+                return
+            self._executor = None
+            self.ready = False
+            self.error = str(error) or type(error).__name__
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"Emotion worker pool broke: {self.error}")
+
+    async def _dispatch(self, batch: List[Tuple[object, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.batched_requests += len(batch)
+        executor = self._executor
+        try:
+            if executor is None:
+                # Queued before the workers died; never fall back to the loop's default executor.
+                raise BrokenProcessPool(self.error or "no workers")
+            results = await asyncio.get_running_loop().run_in_executor(
+                executor, _analyze_batch, [image for image, _ in batch]
+            )
+        except BrokenProcessPool as e:
+            if executor is not None:
+                self._discard_broken(executor, e)
+            unavailable = EmotionPoolUnavailable(f"Emotion worker pool broke: {self.error}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(unavailable)
+            return
+        except Exception as e:
+            results = [(False, str(e))] * len(batch)
+
+        for (_, future), (ok, value) in zip(batch, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(ValueError(value))
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "load_seconds": self.load_time,
+            "error": self.error,
+            "workers": self.workers,
+            "detector_backend": self._analyzer_args[1],
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0
+        }
+
+    def close(self) -> None:
+        if self._batcher:
+            self._batcher.cancel()
+            self._batcher = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.ready = False
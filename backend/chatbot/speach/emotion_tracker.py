@@ -0,0 +1,110 @@
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from chatbot.cache import TTLCache
+
+
+def decode_frame(data: bytes) -> Optional[np.ndarray]:
+    # OpenCV is imported on first use, not when the app starts.
+    import cv2
+
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def frame_thumbnail(frame: np.ndarray, size: int = 32) -> np.ndarray:
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class _TrackedSession:
+    def __init__(self):
+        self.thumbnail: Optional[np.ndarray] = None
+        self.distribution: Optional[Dict[str, float]] = None
+        self.analyzed_at = 0.0
+        self.frames = 0
+        self.analyzed_frames = 0
+        self.busy = False
+
+
+class EmotionTracker:
+    """
+    Per-session emotion state fed by periodic webcam frames. A frame is only
+    analyzed when its grayscale thumbnail differs enough from the last analyzed
+    one (or the state is older than ``max_age``), and results are blended into
+    an exponentially smoothed emotion distribution that can be read without
+    running inference.
+    """
+
+    def __init__(self, alpha: Optional[float] = None, diff_threshold: Optional[float] = None,
+                 max_age: Optional[float] = None, max_sessions: int = 1000, ttl: float = 1800):
+        self.alpha = alpha if alpha is not None else float(os.getenv("EMOTION_SMOOTHING", "0.3"))
+        self.diff_threshold = (diff_threshold if diff_threshold is not None
+                               else float(os.getenv("FRAME_DIFF_THRESHOLD", "6.0")))
+        self.max_age = max_age if max_age is not None else float(os.getenv("FRAME_MAX_AGE_SECONDS", "10"))
+        self._sessions = TTLCache(max_entries=max_sessions, ttl=ttl, sliding=True)
+
+    def _session(self, session_id: str) -> _TrackedSession:
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = _TrackedSession()
+            self._sessions.put(session_id, state)
+        return state
+
+    def _changed(self, state: _TrackedSession, thumbnail: np.ndarray) -> bool:
+        if state.thumbnail is None or time.monotonic() - state.analyzed_at >= self.max_age:
+            return True
+        return float(np.abs(thumbnail - state.thumbnail).mean()) >= self.diff_threshold
+
+    def _blend(self, state: _TrackedSession, scores: Dict[str, float]) -> None:
+        total = sum(scores.values()) or 1.0
+        observed = {emotion: float(score) / total for emotion, score in scores.items()}
+        if state.distribution is None:
+            state.distribution = observed
+            return
+        state.distribution = {
+            emotion: self.alpha * observed.get(emotion, 0.0) + (1 - self.alpha) * state.distribution.get(emotion, 0.0)
+            for emotion in set(observed) | set(state.distribution)
+        }
+
+    async def submit_frame(self, session_id: str, frame: np.ndarray,
+                           analyze: Callable[[np.ndarray], Awaitable[List[Dict]]]) -> Dict:
+        state = self._session(session_id)
+        state.frames += 1
+        thumbnail = frame_thumbnail(frame)
+
+        # One inference in flight per session; frames arriving meanwhile are dropped.
+        if state.busy or not self._changed(state, thumbnail):
+            return self.current(session_id) | {"analyzed": False}
+
+        state.busy = True
+        try:
+            result = await analyze(frame)
+            self._blend(state, result[0]["emotion"])
+            state.thumbnail = thumbnail
+            state.analyzed_at = time.monotonic()
+            state.analyzed_frames += 1
+        finally:
+            state.busy = False
+
+        return self.current(session_id) | {"analyzed": True}
+
+    def current(self, session_id: str) -> Dict:
+        state = self._sessions.get(session_id)
+        if state is None or state.distribution is None:
+            return {"emotion": None, "distribution": None, "frames": state.frames if state else 0}
+
+        return {
+            "emotion": max(state.distribution, key=state.distribution.get),
+            "distribution": state.distribution,
+            "age_seconds": time.monotonic() - state.analyzed_at,
+            "frames": state.frames,
+            "analyzed_frames": state.analyzed_frames
+        }
+
+    def current_emotion(self, session_id: str) -> Optional[str]:
+        return self.current(session_id)["emotion"]
@@ -1,75 +1,304 @@
-import uuid
+import asyncio
+import functools
+import re
+from typing import Optional
 
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import Depends, FastAPI, File, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 import os
 
 # Assuming your AI code is in a module called ai_bot
-from app.speach.chatbot_client import EmotionAwareBot
+from chatbot.clients import clients
+from chatbot.lazy import Lazy
+from chatbot.sessions import issue_session_cookie, resolve_session_id, session_headers
+from chatbot.speach.audio_delivery import AUDIO_FORMATS, build_audio_response, negotiate_format
+from chatbot.speach.emotion_pool import EmotionPoolUnavailable
+from chatbot.speach.emotion_tracker import decode_frame
+from chatbot.speach.streaming_stt import get_streaming_stt_backend
+from chatbot.telemetry import CONTENT_TYPE, count_bytes, registry, trace_requests
+from chatbot.uploads import UnsupportedUpload, UploadSizeLimit, UploadTooLarge, get_upload_store
 
-# Initialize the router and the AI bot
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1").lower() in ("1", "true", "yes")
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv("AUDIO_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+FRAME_UPLOAD_MAX_BYTES = int(os.getenv("FRAME_UPLOAD_MAX_BYTES", str(2 * 1024 * 1024)))
+
+
+def _build_bot():
+    # LangChain, Deepgram and DeepFace load here, not when the app is imported.
+    from chatbot.speach.chatbot_client import EmotionAwareBot
+
+    return EmotionAwareBot()
+
+
+# Initialize the router; the AI bot is built by the warm-up task or on first use
 router = FastAPI()
-bot = EmotionAwareBot()
+speech_bot = Lazy(_build_bot, "speech_bot")
+impression_store = get_upload_store()
+router.middleware("http")(trace_requests)
+router.middleware("http")(issue_session_cookie)
+router.add_middleware(UploadSizeLimit, limits={
+    "/generate_impression": impression_store.max_bytes,
+    "/frames": FRAME_UPLOAD_MAX_BYTES,
+    "/process-audio/": AUDIO_UPLOAD_MAX_BYTES,
+    "/process-audio/stream": AUDIO_UPLOAD_MAX_BYTES,
+})
+registry.register_collector(lambda: speech_bot.peek().metric_samples() if speech_bot.ready else [])
+registry.register_collector(clients.metric_samples)
 
-TEMP_FILE_PATHS = []
 
+async def get_bot():
+    return await speech_bot.aget()
 
-@router.post("/generate_impression")
-async def user_first_impression(image: UploadFile):
+
+async def load_emotion_models():
+    bot = await speech_bot.aget()
+    if bot.emotion_pool:
+        await run_in_threadpool(bot.emotion_pool.start)
+    else:
+        await run_in_threadpool(bot.emotion_analyzer.load)
+
+
+async def warm_up():
     try:
-        save_dir = "./data/user/first_impression"
-        os.makedirs(save_dir, exist_ok=True)
+        await load_emotion_models()
+        await clients.start()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+
+@router.on_event("startup")
+async def start_warm_up():
+    # In the background so the server accepts requests at once; /health reports 503 until ready.
+    if WARMUP_ON_STARTUP:
+        router.state.warm_up = asyncio.create_task(warm_up())
+    if impression_store.retention:
+        router.state.upload_retention = asyncio.create_task(impression_store.run_retention())
+
+
+@router.on_event("shutdown")
+def stop_emotion_workers():
+    bot = speech_bot.peek()
+    if bot and bot.emotion_pool:
+        bot.emotion_pool.close()
+    if bot:
+        bot.history.close()
+
 
-        filename = f"image_{len(os.listdir(save_dir)) + 1}.jpg"
-        file_path = os.path.join(save_dir, filename)
+@router.on_event("shutdown")
+async def close_upstream_clients():
+    await clients.aclose()
 
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
 
-        analysis = bot.analyze_image(file_path)
+@router.get("/health")
+async def health():
+    bot = speech_bot.peek()
+    if bot is None:
+        return JSONResponse({"status": "loading", "bot": speech_bot.status()}, status_code=503)
+
+    status = (bot.emotion_pool or bot.emotion_analyzer).status()
+    return JSONResponse(
+        {
+            "status": "ok" if status["ready"] else "unavailable" if status.get("error") else "loading",
+            "emotion_models": status,
+            "face_cache": bot.face_cache_stats(),
+            "face_preprocess": bot.face_preprocessor.stats(),
+            "coalescing": bot.coalescing_stats(),
+            "upstreams": clients.stats(),
+            "uploads": impression_store.stats()
+        },
+        status_code=200 if status["ready"] else 503
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+@router.post("/generate_impression")
+async def user_first_impression(image: UploadFile, session_id: str = Depends(resolve_session_id),
+                                bot=Depends(get_bot)):
+    try:
+        stored = await run_in_threadpool(impression_store.save, image.file)
+        count_bytes("voice", "in", "upload", stored["size"])
+
+        analysis = await bot.aanalyze_image(stored["path"], session_id)
 
         return {"result": str(analysis)}
 
         # return {"message": "File saved successfully", "file_path": file_path}
 
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except UnsupportedUpload as e:
+        return JSONResponse({"error": str(e)}, status_code=415)
+    except EmotionPoolUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
+    except Exception as e:
+        return {"message": str(e)}
+
+@router.post("/frames")
+async def submit_frame(frame: UploadFile, session_id: str = Depends(resolve_session_id), bot=Depends(get_bot)):
+    """
+    Accepts a periodic webcam frame. Frames that barely differ from the last
+    analyzed one skip DeepFace; the smoothed emotion state is returned either way.
+    """
+    try:
+        image = await run_in_threadpool(decode_frame, await frame.read())
+        if image is None:
+            return {"message": "Could not decode frame"}
+
+        state = await bot.emotion_tracker.submit_frame(
+            session_id, image, functools.partial(bot.analyze_frame, session_id=session_id)
+        )
+        return jsonable_encoder(state)
+
+    except EmotionPoolUnavailable as e:
+        return JSONResponse({"error": str(e)}, status_code=503)
     except Exception as e:
         return {"message": str(e)}
 
+
+@router.get("/emotion")
+async def current_emotion(session_id: str = Depends(resolve_session_id), bot=Depends(get_bot)):
+    return jsonable_encoder(bot.emotion_tracker.current(session_id))
+
+
 @router.post("/process-audio/")
-async def process_audio(file: UploadFile = File(...)):
+async def process_audio(request: Request, file: UploadFile = File(...), format: Optional[str] = None,
+                        session_id: str = Depends(resolve_session_id), bot=Depends(get_bot)):
     """
     API endpoint to process an audio file.
-    Accepts a .wav file, transcribes it, processes the transcription, and returns a .wav response.
+    Accepts a .wav file, transcribes it, processes the transcription, and returns the spoken response.
+    The output codec (wav, mp3 or opus) comes from the ``format`` query parameter or the Accept
+    header. The body is sent in fixed-size chunks with Content-Length and Range support, and
+    when the TTS cache is enabled Content-Location points at a GET URL the client can seek in.
     """
-    # Step 1: Save the uploaded file to a temporary location
-    temp_file_path = f"temp_{uuid.uuid4().hex}.wav"
-    TEMP_FILE_PATHS.append(temp_file_path)
+    audio_format = negotiate_format(format, request.headers.get("accept"))
+    audio = await file.read()
+    count_bytes("voice", "in", "upload", len(audio))
 
-    with open(temp_file_path, "wb") as temp_file:
-        temp_file.write(await file.read())
+    result = await run_in_threadpool(bot.process_audio_bytes, audio, session_id=session_id,
+                                     audio_format=audio_format)
 
-    # Step 2: Process the audio file using the AI bot
-    result = bot.process_audio_file(audio_path=temp_file_path)
-
-    # Step 3: Check for errors in the bot's response
     if "error" in result:
         return {"error": result["error"]}
 
-    # Step 4: Load the generated audio file
-    audio_response_path = result.get("audio_response")
-    if not audio_response_path or not os.path.exists(audio_response_path):
+    audio_response = result.get("audio_response")
+    if not audio_response:
         return {"error": "Failed to generate audio response"}
 
-    # Step 5: Stream the `.wav` file back to the client
-    def iterfile():
-        with open(audio_response_path, mode="rb") as audio_file:
-            yield from audio_file
+    count_bytes("voice", "out", "response_audio", len(audio_response))
+    headers = {"Content-Disposition": f"attachment; filename=response.{audio_format}"}
+    if result.get("audio_key"):
+        headers["Content-Location"] = f"{request.scope.get('root_path', '')}/audio/{result['audio_key']}?format={audio_format}"
+
+    return build_audio_response(audio_response, audio_format, request.headers.get("range"), headers)
 
-    # Step 6: Clean up temporary files
-    os.remove(temp_file_path)
+
+@router.get("/audio/{audio_key}")
+async def get_audio(audio_key: str, request: Request, format: str = "wav", bot=Depends(get_bot)):
+    """Previously synthesized response audio from the TTS cache, with Range support for seeking."""
+    if format not in AUDIO_FORMATS or not bot.tts.cache or not re.fullmatch(r"[0-9a-f]{40}", audio_key):
+        return JSONResponse({"error": "Audio not found"}, status_code=404)
+
+    audio = await run_in_threadpool(bot.tts.cache.get, audio_key)
+    if audio is None:
+        return JSONResponse({"error": "Audio not found"}, status_code=404)
+
+    return build_audio_response(audio, format, request.headers.get("range"))
+
+
+@router.post("/process-audio/stream")
+async def process_audio_stream(file: UploadFile = File(...), session_id: str = Depends(resolve_session_id),
+                               bot=Depends(get_bot)):
+    """
+    Like /process-audio/, but streams the WAV response sentence by sentence
+    while the answer is still being generated.
+    """
+    text_query = await run_in_threadpool(bot.stt.transcribe_bytes, await file.read())
+
+    if not text_query:
+        return {"error": "Failed to transcribe audio"}
 
     return StreamingResponse(
-        iterfile(),
-        media_type="audio/wav",
-        headers={"Content-Disposition": f"attachment; filename={os.path.basename(audio_response_path)}"}
+        bot.stream_interaction(text_query, session_id=session_id),
+        media_type="audio/wav"
     )
+
+
+@router.websocket("/ws/audio")
+async def stream_audio(websocket: WebSocket, session_id: str = Depends(resolve_session_id), bot=Depends(get_bot)):
+    """
+    Streaming voice turn. The client sends 16 kHz mono linear16 PCM frames as
+    binary messages and the text message "end" when it is done. The server sends
+    {"type": "transcript", "text", "is_final"} events and, for every finalized
+    utterance, the spoken WAV response as binary messages followed by a
+    {"type": "response", "text"} event. If transcription or the spoken
+    response fails, the socket is closed with code 1011.
+    """
+    # Handshake headers are the only chance to hand a new client its session cookie.
+    await websocket.accept(headers=session_headers(websocket))
+    stt = get_streaming_stt_backend()
+
+    async def respond():
+        async for event in stt.events():
+            await websocket.send_json({"type": "transcript", **event})
+            if not event["is_final"]:
+                continue
+
+            reply = []
+            turn = bot.stream_interaction(event["text"], session_id=session_id, reply=reply)
+            async for chunk in iterate_in_threadpool(turn):
+                await websocket.send_bytes(chunk)
+            await websocket.send_json({"type": "response", "text": "".join(reply)})
+
+    responder = None
+    finished = False
+    try:
+        await stt.start()
+        responder = asyncio.create_task(respond())
+        while True:
+            receiving = asyncio.ensure_future(websocket.receive())
+            await asyncio.wait((receiving, responder), return_when=asyncio.FIRST_COMPLETED)
+            if not receiving.done():
+                # Before "end" the responder only stops when it failed; raise its error now.
+                receiving.cancel()
+                responder.result()
+                break
+            message = receiving.result()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await stt.send(message["bytes"])
+            elif message.get("text") == "end":
+                break
+
+        finished = True
+        await stt.finish()
+        await responder
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        print("Websocket connection closed")
+
+    except Exception as e:
+        print(f"Streaming voice turn error: {e}")
+        try:
+            await websocket.close(code=1011, reason="Voice turn failed")
+        except RuntimeError:
+            # Already closed.
+            pass
+
+    finally:
+        if responder is not None and not responder.done():
+            responder.cancel()
+            await asyncio.gather(responder, return_exceptions=True)
+        if responder is not None and not finished:
+            # Close the transcription session without masking the error being handled.
+            try:
+                await stt.finish()
+            except Exception as e:
+                print(f"Streaming STT finish error: {e}")
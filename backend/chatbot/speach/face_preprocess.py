@@ -0,0 +1,200 @@
+import os
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+
+from chatbot.cache import TTLCache
+from chatbot.telemetry import span
+
+DETECTOR_BACKENDS = ("opencv", "ssd", "mtcnn", "retinaface", "skip")
+
+
+def validate_detector(detector_backend: str) -> str:
+    if detector_backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown face detector {detector_backend!r}, expected one of {', '.join(DETECTOR_BACKENDS)}")
+    return detector_backend
+
+
+class FaceRegion(NamedTuple):
+    """Face bounding box as fractions of the full image, so it survives resizing."""
+    x: float
+    y: float
+    w: float
+    h: float
+
+
+class PreparedImage(NamedTuple):
+    image: np.ndarray
+    # The part of the full image ``image`` shows; (0, 0, 1, 1) unless it was cropped.
+    window: FaceRegion
+
+    @property
+    def cropped(self) -> bool:
+        return self.window != FULL_FRAME
+
+
+FULL_FRAME = FaceRegion(0.0, 0.0, 1.0, 1.0)
+
+
+def _longest_side(path: str) -> int:
+    try:
+        from PIL import Image
+
+        # Opening only parses the header.
+        with Image.open(path) as image:
+            return max(image.size)
+    except (ImportError, OSError):
+        return 0
+
+
+def load_image(image: Union[str, np.ndarray], max_side: int = 0) -> np.ndarray:
+    """
+    Decode ``image`` unless it already is an array. With ``max_side`` a large
+    JPEG is decoded at 1/2, 1/4 or 1/8 scale straight away, as long as that
+    still leaves its longer side at least ``max_side``; that skips most of
+    the decoding work and the resize.
+    """
+    if isinstance(image, np.ndarray):
+        return image
+
+    import cv2
+
+    flags = cv2.IMREAD_COLOR
+    longest = _longest_side(image) if max_side else 0
+    for factor, reduced in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                            (2, cv2.IMREAD_REDUCED_COLOR_2)):
+        if longest // factor >= max_side > 0:
+            flags = reduced
+            break
+
+    # imdecode rather than imread: imread cannot open non-ASCII paths on Windows.
+    decoded = cv2.imdecode(np.fromfile(image, dtype=np.uint8), flags)
+    if decoded is None:
+        raise ValueError(f"Could not decode image {image}")
+    return decoded
+
+
+def downscale(image: np.ndarray, max_side: int) -> np.ndarray:
+    height, width = image.shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return image
+    scale = max_side / max(height, width)
+
+    import cv2
+
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class FacePreprocessor:
+    """
+    Turns an upload or webcam frame into the array DeepFace sees. The image is
+    decoded once and shrunk so its longer side is at most ``max_side``: the
+    detector's cost grows with pixel count, while the attribute models only
+    ever look at a 48px (emotion) or 224px (gender) face crop.
+
+    With ``reuse_region`` the face box DeepFace found for a session's last
+    image is remembered for ``region_ttl`` seconds, and the next image from
+    that session is cropped to the box plus ``crop_margin`` (relative to the
+    face size) before detection. A crop that no longer contains the face is
+    retried on the whole image.
+    """
+
+    def __init__(self, max_side: Optional[int] = None, crop_margin: Optional[float] = None,
+                 reuse_region: Optional[bool] = None, region_ttl: Optional[float] = None):
+        self.max_side = max_side if max_side is not None else int(os.getenv("FACE_MAX_SIDE", "640"))
+        self.crop_margin = crop_margin if crop_margin is not None else float(os.getenv("FACE_CROP_MARGIN", "0.6"))
+        if reuse_region is None:
+            reuse_region = os.getenv("FACE_REUSE_REGION", "1").lower() in ("1", "true", "yes")
+        self.reuse_region = reuse_region
+        self.regions = TTLCache(
+            max_entries=int(os.getenv("FACE_REGION_ENTRIES", "4096")),
+            ttl=region_ttl if region_ttl is not None else float(os.getenv("FACE_REGION_TTL", "30"))
+        )
+        self.crops = 0
+        self.crop_misses = 0
+
+    def settings(self) -> str:
+        """Everything that changes what the analyzer is given, for cache keys."""
+        return f"max_side={self.max_side}"
+
+    def _crop_window(self, region: FaceRegion) -> FaceRegion:
+        margin_x = region.w * self.crop_margin
+        margin_y = region.h * self.crop_margin
+        x0, y0 = max(0.0, region.x - margin_x), max(0.0, region.y - margin_y)
+        x1, y1 = min(1.0, region.x + region.w + margin_x), min(1.0, region.y + region.h + margin_y)
+        return FaceRegion(x0, y0, x1 - x0, y1 - y0)
+
+    def prepare(self, image: Union[str, np.ndarray], session_id: Optional[str] = None) -> PreparedImage:
+        full = load_image(image, self.max_side)
+        region = self.regions.get(session_id) if self.reuse_region and session_id is not None else None
+        if region is None:
+            return PreparedImage(downscale(full, self.max_side), FULL_FRAME)
+
+        window = self._crop_window(region)
+        height, width = full.shape[:2]
+        x0, y0 = int(window.x * width), int(window.y * height)
+        x1, y1 = int((window.x + window.w) * width), int((window.y + window.h) * height)
+        self.crops += 1
+        return PreparedImage(downscale(full[y0:y1, x0:x1], self.max_side), window)
+
+    def full_frame(self, image: Union[str, np.ndarray]) -> PreparedImage:
+        self.crop_misses += 1
+        return PreparedImage(downscale(load_image(image, self.max_side), self.max_side), FULL_FRAME)
+
+    def remember(self, session_id: Optional[str], prepared: PreparedImage, result: List[Dict]) -> None:
+        """Store the face box from a DeepFace ``result`` as the session's next crop."""
+        if not self.reuse_region or session_id is None:
+            return
+        region = face_region(result, prepared)
+        if region is None:
+            self.regions.pop(session_id)
+        else:
+            self.regions.put(session_id, region)
+
+    def analyze(self, analyze: Callable[[np.ndarray], List[Dict]], image: Union[str, np.ndarray],
+                session_id: Optional[str] = None) -> List[Dict]:
+        """Preprocess ``image`` and run ``analyze`` on it; blocking."""
+        with span("voice", "face.preprocess"):
+            prepared = self.prepare(image, session_id)
+        with span("voice", "face.analyze"):
+            try:
+                result = analyze(prepared.image)
+            except ValueError:
+                # No face in the session's remembered crop: it moved, so look at the whole image.
+                if not prepared.cropped:
+                    raise
+                prepared = self.full_frame(image)
+                result = analyze(prepared.image)
+        self.remember(session_id, prepared, result)
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "max_side": self.max_side,
+            "reuse_region": self.reuse_region,
+            "crop_margin": self.crop_margin,
+            "crops": self.crops,
+            "crop_misses": self.crop_misses,
+            "sessions": len(self.regions)
+        }
+
+
+def face_region(result: List[Dict], prepared: PreparedImage) -> Optional[FaceRegion]:
+    """
+    The first face's box in full-image fractions, or None when DeepFace did not
+    actually locate a face (the ``skip`` detector, or no detection with
+    ``enforce_detection=False``), in which case it reports the whole input.
+    """
+    box = result[0].get("region") if result else None
+    height, width = prepared.image.shape[:2]
+    if not box or box["w"] * box["h"] >= 0.95 * width * height:
+        return None
+
+    window = prepared.window
+    return FaceRegion(
+        window.x + box["x"] / width * window.w,
+        window.y + box["y"] / height * window.h,
+        box["w"] / width * window.w,
+        box["h"] / height * window.h
+    )
@@ -0,0 +1,96 @@
+import re
+import struct
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Deque, Iterable, Iterator, List, Optional
+
+_BOUNDARY_RE = re.compile(r"[.!?…]+[\"')\]]*(?=\s)|\n+")
+_ABBREVIATIONS = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "approx"
+})
+
+STREAMING_DATA_SIZE = 0xFFFFFFFF
+
+
+class SentenceSplitter:
+    """
+    Incrementally cuts a token stream into sentences. Very short sentences are
+    held back and merged with the next one so each TTS request carries enough
+    text to sound natural.
+    """
+
+    def __init__(self, min_chars: int = 24):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def _is_abbreviation(self, end: int) -> Optional[bool]:
+        """Whether the period ending at ``end`` belongs to an abbreviation; None until that is known."""
+        word = (self._buffer[:end].rstrip(".").rsplit(None, 1)[-1:] or [""])[0].lower()
+        if word != "no":
+            return word in _ABBREVIATIONS
+        # "No. 5" is a number sign, but "I said no. Then" ends a sentence.
+        following = self._buffer[end:].lstrip()
+        return following[0].isdigit() if following else None
+
+    def feed(self, token: str) -> List[str]:
+        self._buffer += token
+        sentences = []
+        start = 0
+        for match in _BOUNDARY_RE.finditer(self._buffer):
+            end = match.end()
+            if self._buffer[match.start()] == ".":
+                abbreviation = self._is_abbreviation(match.start() + 1)
+                if abbreviation is None:
+                    # Wait for the next token to decide.
+                    break
+                if abbreviation:
+                    continue
+            if len(self._buffer[start:end].strip()) < self.min_chars:
+                continue
+            sentences.append(self._buffer[start:end].strip())
+            start = end
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return rest or None
+
+
+def streaming_wav_header(sample_rate: int = 16000, channels: int = 1, bits_per_sample: int = 16,
+                         data_size: int = STREAMING_DATA_SIZE) -> bytes:
+    """PCM WAV header; the default sizes mark a stream of unknown length."""
+    byte_rate = sample_rate * channels * bits_per_sample // 8
+    block_align = channels * bits_per_sample // 8
+    riff_size = STREAMING_DATA_SIZE if data_size == STREAMING_DATA_SIZE else data_size + 36
+    return (
+        b"RIFF" + struct.pack("<I", riff_size) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, block_align, bits_per_sample)
+        + b"data" + struct.pack("<I", data_size)
+    )
+
+
+def pipeline_tts(tokens: Iterable[str], synthesize: Callable[[str], Optional[bytes]], executor: Executor,
+                 splitter: Optional[SentenceSplitter] = None) -> Iterator[bytes]:
+    """
+    Submit each sentence to ``synthesize`` as soon as it is complete and yield
+    the audio in sentence order while the LLM keeps generating.
+    """
+    splitter = splitter or SentenceSplitter()
+    pending: Deque = deque()
+
+    def drain(block: bool) -> Iterator[bytes]:
+        while pending and (block or pending[0].done()):
+            audio = pending.popleft().result()
+            if audio:
+                yield audio
+
+    for token in tokens:
+        for sentence in splitter.feed(token):
+            pending.append(executor.submit(synthesize, sentence))
+        yield from drain(block=False)
+
+    rest = splitter.flush()
+    if rest:
+        pending.append(executor.submit(synthesize, rest))
+    yield from drain(block=True)
@@ -0,0 +1,140 @@
+import abc
+import asyncio
+import json
+import os
+from typing import AsyncIterator, List, Optional, TypedDict
+
+
+class TranscriptEvent(TypedDict):
+    text: str
+    is_final: bool
+
+
+class StreamingSTTBackend(abc.ABC):
+    """
+    Streaming speech-to-text session: PCM frames go in through ``send`` and
+    interim/final transcripts come out of ``events``. A final event carries a
+    complete utterance.
+    """
+
+    def __init__(self):
+        self._events: "asyncio.Queue[Optional[TranscriptEvent]]" = asyncio.Queue()
+
+    async def start(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def send(self, frame: bytes) -> None:
+        ...
+
+    async def finish(self) -> None:
+        await self._events.put(None)
+
+    async def events(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+    async def _emit(self, text: str, is_final: bool) -> None:
+        await self._events.put({"text": text, "is_final": is_final})
+
+
+class DeepgramStreamingSTT(StreamingSTTBackend):
+    def __init__(self, sample_rate: int = 16000):
+        # Imported here so the fake backend works without the Deepgram SDK.
+        from chatbot.clients import clients
+
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.deepgram = clients.deepgram()
+        self.connection = None
+        self._utterance: List[str] = []
+
+    async def start(self) -> None:
+        from deepgram import LiveOptions, LiveTranscriptionEvents
+
+        self.connection = self.deepgram.listen.asyncwebsocket.v("1")
+        self.connection.on(LiveTranscriptionEvents.Transcript, self._on_transcript)
+
+        options = LiveOptions(
+            model="nova-2",
+            language="en-US",
+            encoding="linear16",
+            sample_rate=self.sample_rate,
+            channels=1,
+            punctuate=True,
+            smart_format=True,
+            interim_results=True,
+            endpointing=300
+        )
+        if await self.connection.start(options) is False:
+            raise RuntimeError("Failed to start Deepgram live transcription")
+
+    async def _on_transcript(self, _connection, result, **kwargs) -> None:
+        transcript = result.channel.alternatives[0].transcript
+        if result.is_final and transcript:
+            self._utterance.append(transcript)
+
+        text = " ".join(self._utterance if result.is_final else self._utterance + [transcript]).strip()
+        if result.speech_final and text:
+            self._utterance = []
+            await self._emit(text, True)
+        elif text:
+            await self._emit(text, False)
+
+    async def send(self, frame: bytes) -> None:
+        await self.connection.send(frame)
+
+    async def finish(self) -> None:
+        if self.connection:
+            await self.connection.finish()
+        if self._utterance:
+            await self._emit(" ".join(self._utterance), True)
+            self._utterance = []
+        await super().finish()
+
+
+class FakeStreamingSTT(StreamingSTTBackend):
+    """
+    Offline backend that replays fixture transcripts, releasing one event for
+    every ``frames_per_event`` frames received.
+    """
+
+    DEFAULT_TRANSCRIPTS: List[TranscriptEvent] = [
+        {"text": "I have been", "is_final": False},
+        {"text": "I have been feeling anxious", "is_final": False},
+        {"text": "I have been feeling anxious about work.", "is_final": True},
+    ]
+
+    def __init__(self, transcripts: Optional[List[TranscriptEvent]] = None, frames_per_event: int = 5):
+        super().__init__()
+        self._pending = list(transcripts or self.DEFAULT_TRANSCRIPTS)
+        self.frames_per_event = frames_per_event
+        self._frames = 0
+
+    @classmethod
+    def from_file(cls, path: str, frames_per_event: int = 5) -> "FakeStreamingSTT":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), frames_per_event)
+
+    async def send(self, frame: bytes) -> None:
+        self._frames += 1
+        if self._pending and self._frames % self.frames_per_event == 0:
+            await self._events.put(self._pending.pop(0))
+
+    async def finish(self) -> None:
+        while self._pending:
+            await self._events.put(self._pending.pop(0))
+        await super().finish()
+
+
+def get_streaming_stt_backend() -> StreamingSTTBackend:
+    backend = os.getenv("STREAMING_STT_BACKEND", "deepgram")
+    if backend == "fake":
+        fixture_path = os.getenv("STREAMING_STT_FIXTURE")
+        return FakeStreamingSTT.from_file(fixture_path) if fixture_path else FakeStreamingSTT()
+    if backend == "deepgram":
+        return DeepgramStreamingSTT()
+    raise ValueError(f"Unknown streaming STT backend: {backend}")
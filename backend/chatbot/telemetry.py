@@ -0,0 +1,270 @@
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+trace_id_var: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, k)} {v}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        # Per label set: [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(k, list(v)) for k, v in self._values.items()]
+        lines = self.header()
+        names = self.labels + ("le",)
+        for labels, state in values:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics in the Prometheus text format. Besides metrics updated on the
+    hot path, collectors are called at scrape time to export values other
+    components already keep, such as cache statistics.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, labels: Tuple[str, ...], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]) -> None:
+        """``collector`` yields (name, type, labels, value) samples."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # The text format wants each family's samples together under one TYPE line,
+        # but several collectors export the same families (e.g. chatbot_cache_hits_total).
+        families: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+                continue
+            for name, kind, labels, value in samples:
+                family = families.setdefault(name, (kind, []))
+                family[1].append(f"{name}{_format_labels(labels.keys(), labels.values())} {value}")
+        for name, (kind, samples) in families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_duration_seconds", "Wall-clock time per pipeline stage.", ("service", "stage")
+)
+STAGE_ERRORS = registry.counter(
+    "chatbot_stage_errors_total", "Stages that raised, including upstream failures.", ("service", "stage")
+)
+STAGE_IN_FLIGHT = registry.gauge(
+    "chatbot_stage_in_flight", "Stages currently running.", ("service", "stage")
+)
+BYTES = registry.counter(
+    "chatbot_bytes_total", "Payload bytes by direction and kind.", ("service", "direction", "kind")
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NOT_ERRORS = (GeneratorExit, asyncio.CancelledError)
+
+_TRACE_LOG = os.getenv("TRACE_LOG", "").lower() in ("1", "true", "yes")
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> Optional[str]:
+    return trace_id_var.get()
+
+
+@contextmanager
+def trace(trace_id: Optional[str] = None):
+    """Bind a trace id (a new one unless given) to the spans recorded inside."""
+    token = trace_id_var.set(trace_id or trace_id_var.get() or new_trace_id())
+    try:
+        yield trace_id_var.get()
+    finally:
+        trace_id_var.reset(token)
+
+
+class span:
+    """
+    Time one pipeline stage into the stage histogram, counting in-flight
+    calls and exceptions. With TRACE_LOG=1 each span is also printed as a
+    JSON line carrying the current trace id.
+
+        with span("text", "search.upstream"):
+            ...
+
+    A class rather than a generator context manager, which costs about a
+    fifth more per span.
+    """
+
+    __slots__ = ("labels", "start")
+
+    def __init__(self, service: str, stage: str):
+        self.labels = (service, stage)
+
+    def __enter__(self) -> "span":
+        STAGE_IN_FLIGHT.inc(*self.labels)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self.start
+        STAGE_IN_FLIGHT.dec(*self.labels)
+        STAGE_SECONDS.observe(elapsed, *self.labels)
+        # GeneratorExit and CancelledError mean the consumer went away (a closed stream,
+        # a disconnected client), not that the stage failed.
+        error = exc_type.__name__ if exc_type is not None and exc_type not in _NOT_ERRORS else None
+        if error:
+            STAGE_ERRORS.inc(*self.labels)
+        if _TRACE_LOG:
+            print(json.dumps({
+                "trace_id": trace_id_var.get(), "service": self.labels[0], "stage": self.labels[1],
+                "duration_ms": round(elapsed * 1000, 3), "error": error
+            }))
+
+
+async def trace_requests(request, call_next):
+    """HTTP middleware: reuse the caller's X-Trace-Id or start a new trace, and echo it back."""
+    with trace(request.headers.get("x-trace-id")) as trace_id:
+        response = await call_next(request)
+    response.headers["X-Trace-Id"] = trace_id
+    return response
+
+
+def count_bytes(service: str, direction: str, kind: str, size: int) -> None:
+    BYTES.inc(service, direction, kind, amount=size)
+
+
+def in_context(fn: Callable, *args, **kwargs) -> Callable:
+    """``fn`` bound to a copy of the current context, for executors that don't propagate it."""
+    return partial(copy_context().run, fn, *args, **kwargs)
+
+
+def stats_samples(prefix: str, labels: Dict[str, str],
+                  stats: Optional[Dict]) -> List[Tuple[str, str, Dict[str, str], float]]:
+    """Collector samples from the ``stats()`` dict of a TTLCache, DiskCache, SingleFlight or upstream pool."""
+    if not stats:
+        return []
+    samples = []
+    for key in ("hits", "misses", "evictions", "executions", "coalesced", "errors", "cancelled", "requests", "queued"):
+        if key in stats:
+            samples.append((f"{prefix}_{key}_total", "counter", labels, stats[key]))
+    for key in ("entries", "bytes", "in_flight", "limit"):
+        if key in stats:
+            samples.append((f"{prefix}_{key}", "gauge", labels, stats[key]))
+    return samples
@@ -1,12 +1,30 @@
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, Depends, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from chatbot.text.main import TextTherapyService
+from chatbot.clients import clients
+from chatbot.lazy import Lazy
+from chatbot.sessions import resolve_session_id
+from chatbot.telemetry import registry
+
+
+def _build_text_service():
+    # LangChain, DuckDuckGo and the history store load here, not when the app is imported.
+    from chatbot.text.main import TextTherapyService
+
+    return TextTherapyService()
 
 
 text_service_router = APIRouter()
-text_service = TextTherapyService()
+text_service = Lazy(_build_text_service, "text_service")
+registry.register_collector(lambda: text_service.peek().metric_samples() if text_service.ready else [])
+
+
+async def get_text_service():
+    return await text_service.aget()
 
 
 class UserInput(BaseModel):
@@ -14,9 +32,53 @@ class UserInput(BaseModel):
 
 
 @text_service_router.post("/user/input")
-def generate_response(user_input: UserInput):
-    result = text_service.process_message(user_input.text)
+async def generate_response(user_input: UserInput, session_id: str = Depends(resolve_session_id),
+                            service=Depends(get_text_service)):
+    result = await service.aprocess_message(user_input.text, session_id)
 
     response = {"result": result["response"]}
 
     return jsonable_encoder(response)
+
+
+@text_service_router.post("/user/input/stream")
+async def generate_response_stream(user_input: UserInput, request: Request,
+                                   session_id: str = Depends(resolve_session_id), service=Depends(get_text_service)):
+    """
+    Stream the therapist response as Server-Sent Events: one ``data`` event per
+    token, then a ``done`` event.
+    """
+    async def events():
+        stream = service.astream_message(user_input.text, session_id)
+        try:
+            async for token in stream:
+                if await request.is_disconnected():
+                    break
+                yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+            else:
+                yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': 'Failed to process message'})}\n\n"
+        finally:
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@text_service_router.get("/stats")
+async def service_stats():
+    service = text_service.peek()
+    if service is None:
+        return {"service": text_service.status(), "upstreams": clients.stats()}
+    return {
+        "service": text_service.status(),
+        "search_cache": service.search_cache.stats(),
+        "search_coalescing": service.search_flight.stats(),
+        "sessions": service.sessions.stats(),
+        "upstreams": clients.stats()
+    }
@@ -1,62 +1,123 @@
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from datetime import datetime
-import json
+import asyncio
 from duckduckgo_search import DDGS
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 import os
 from dotenv import load_dotenv
 
+from chatbot.clients import clients
+from chatbot.history import DEFAULT_SESSION, get_history_store
+from chatbot.memory import MemoryStore
+from chatbot.prompt import ConversationSummarizer, PromptBuilder, compact_json
+from chatbot.search import SearchCache, extract_search_query
+from chatbot.sessions import SessionManager
+from chatbot.singleflight import SingleFlight
+from chatbot.telemetry import in_context, span, stats_samples
+
 load_dotenv()
 
+SYSTEM_PROMPT = "You are an empathetic AI therapist."
+
+RESPONSE_INSTRUCTIONS = """Please provide a therapeutic response that:
+1. Shows understanding of the user's message
+2. References relevant parts of the conversation history
+3. Incorporates helpful information from search results
+4. Maintains a warm and professional tone"""
+
 
 class TextTherapyService:
     def __init__(self):
-        self.openai = ChatOpenAI(model="gpt-4o-mini", api_key=os.getenv("OPENAI_API_KEY"))
+        self.openai = clients.chat_model("gpt-4o-mini")
         self.ddg = DDGS()
-        self.conversation_history = []
-        self.load_history()
-
-    def load_history(self) -> None:
+        self.history = get_history_store()
+        self.sessions = SessionManager(self.history)
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("SEARCH_CONCURRENCY", "32")), thread_name_prefix="ddg"
+        )
+        self._io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="history")
+        self.search_query_mode = os.getenv("SEARCH_QUERY_MODE", "local")
+        self.search_cache = SearchCache()
+        self.search_flight = SingleFlight()
+        self.prompt_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+        self.summarizer = ConversationSummarizer(self.openai, self._format_message, service="text")
+        self.memory = MemoryStore(self.history, self._format_message)
+
+    def save_to_history(self, role: str, message: str, session_id: str = DEFAULT_SESSION) -> None:
         try:
-            with open("chat_history.json", "r", encoding="utf-8") as f:
-                self.conversation_history = json.load(f)
-        except FileNotFoundError:
-            self.conversation_history = []
-
-    def save_to_history(self, role: str, message: str) -> None:
-        self.conversation_history.append({
-            "role": role,
-            "message": message,
-            "timestamp": datetime.now().isoformat()
-        })
-
-        try:
-            with open("chat_history.json", "w", encoding="utf-8") as f:
-                json.dump(self.conversation_history, f, ensure_ascii=False, indent=2)
+            record = {
+                "role": role,
+                "message": message,
+                "timestamp": datetime.now().isoformat()
+            }
+            # Memory first: a cold index is rebuilt from history, which must not yet hold this record.
+            with span("text", "memory.add"):
+                self.memory.add(session_id, record)
+            with span("text", "history.append"):
+                self.sessions.append(session_id, record)
         except Exception as e:
             print(f"Error saving history: {e}")
 
-    def get_recent_messages(self, n: int = 5) -> str:
-        recent = self.conversation_history[-n:] if self.conversation_history else []
-        return "\n".join([
-            f"{msg['role']}: {msg['message']}"
-            for msg in recent
-        ])
+    def get_recent_messages(self, n: int = 5, session_id: str = DEFAULT_SESSION) -> str:
+        recent = self.sessions.recent(session_id, n)
+        return "\n".join([self._format_message(msg) for msg in recent])
+
+    @staticmethod
+    def _summary_messages(text: str, max_length: int) -> List:
+        prompt = f"""
+        Create a short search query (max {max_length} chars) from this text:
+        {text}
+        Focus on key topics and searchable terms.
+        """
+        return [
+            SystemMessage(content="You create concise search queries."),
+            HumanMessage(content=prompt)
+        ]
+
+    def _response_messages(self, user_input: str, session_id: str, search_results: List[Dict]) -> List:
+        with span("text", "prompt"):
+            return self._build_response_messages(user_input, session_id, search_results)
+
+    def _build_response_messages(self, user_input: str, session_id: str, search_results: List[Dict]) -> List:
+        summary, recent = self.summarizer.context(self.sessions.get(session_id))
+        with span("text", "memory.search"):
+            memories = self.memory.relevant(session_id, user_input, exclude_last=len(recent))
+
+        prompt = (
+            PromptBuilder(self.prompt_budget)
+            .reserve(SYSTEM_PROMPT)
+            .add(f"User's message: {user_input}", priority=3)
+            .add(f"Summary of earlier conversation:\n{summary}" if summary else "", priority=1)
+            .add_lines("Relevant earlier messages:", memories, priority=1)
+            .add_lines("Recent conversation:", [self._format_message(m) for m in recent], priority=2)
+            .add(f"Relevant information from search:\n{compact_json(search_results)}" if search_results else "")
+            .add(RESPONSE_INSTRUCTIONS, priority=4)
+            .build()
+        )
+        return [
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(content=prompt)
+        ]
+
+    @staticmethod
+    def _format_message(message: Dict) -> str:
+        # The voice bot shares the history store and writes "speaker" instead of "role".
+        return f"{message.get('role') or message.get('speaker')}: {message['message']}"
+
+    @staticmethod
+    def _format_results(raw_results) -> List[Dict]:
+        return [{
+            "title": r.get("title", ""),
+            "link": r.get("href", ""),
+            "snippet": r.get("body", "")[:500]
+        } for r in raw_results]
 
     def summarize_for_search(self, text: str, max_length: int = 100) -> str:
         try:
-            prompt = f"""
-            Create a short search query (max {max_length} chars) from this text:
-            {text}
-            Focus on key topics and searchable terms.
-            """
-
-            response = self.openai.invoke([
-                SystemMessage(content="You create concise search queries."),
-                HumanMessage(content=prompt)
-            ])
-
+            with span("text", "llm.search_query"):
+                response = self.openai.invoke(self._summary_messages(text, max_length))
             summary = response.content.strip()
             return summary[:max_length]
 
@@ -64,57 +125,155 @@ class TextTherapyService:
             print(f"Summarization error: {e}")
             return text[:max_length]
 
+    def build_search_query(self, text: str, max_length: int = 100) -> str:
+        if self.search_query_mode == "llm":
+            return self.summarize_for_search(text, max_length)
+        return extract_search_query(text, max_length)
+
+    def _search(self, search_query: str, max_results: int) -> List[Dict]:
+        print(f"Searching for: {search_query}")
+        with span("text", "search.upstream"):
+            raw_results = self.ddg.text(search_query, max_results=max_results)
+        results = self._format_results(raw_results)
+        self.search_cache.put_results(search_query, max_results, results)
+        return results
+
     def search_duckduckgo(self, query: str, max_results: int = 3) -> List[Dict]:
+        with span("text", "search"):
+            return self._search_duckduckgo(query, max_results)
+
+    def _search_duckduckgo(self, query: str, max_results: int) -> List[Dict]:
         try:
-            search_query = self.summarize_for_search(query)
-            print(f"Searching for: {search_query}")
-
-            results = []
-            for r in self.ddg.text(search_query, max_results=max_results):
-                results.append({
-                    "title": r.get("title", ""),
-                    "link": r.get("href", ""),
-                    "snippet": r.get("body", "")[:500]
-                })
-            return results
+            search_query = self.build_search_query(query)
+
+            cached = self.search_cache.get_results(search_query, max_results)
+            if cached is not None:
+                return cached
+
+            return self.search_flight.do(
+                self.search_cache.key(search_query, max_results), self._search, search_query, max_results
+            )
 
         except Exception as e:
             print(f"Search error: {e}")
             return []
 
-    def process_message(self, user_input: str) -> Dict:
+    def process_message(self, user_input: str, session_id: str = DEFAULT_SESSION) -> Dict:
+        with span("text", "turn"):
+            return self._process_message(user_input, session_id)
+
+    def _process_message(self, user_input: str, session_id: str) -> Dict:
         try:
-            self.save_to_history("User", user_input)
+            self.save_to_history("User", user_input, session_id)
 
             search_results = self.search_duckduckgo(user_input)
 
-            recent_chat = self.get_recent_messages()
+            recent_chat = self.get_recent_messages(session_id=session_id)
 
-            prompt = f"""
-            You are an empathetic AI therapist.
+            messages = self._response_messages(user_input, session_id, search_results)
+            with span("text", "llm"):
+                response = self.openai.invoke(messages)
 
-            User's message: {user_input}
+            response_text = response.content
+            self.save_to_history("Assistant", response_text, session_id)
+            self.summarizer.schedule(self.sessions.get(session_id))
 
-            Recent conversation:
-            {recent_chat}
+            return {
+                "response": response_text,
+                "search_results": search_results,
+                "conversation_context": recent_chat
+            }
 
-            Relevant information from search:
-            {json.dumps(search_results, indent=2)}
+        except Exception as e:
+            print(f"Error processing message: {e}")
+            return {
+                "error": "Failed to process message",
+                "details": str(e)
+            }
+
+    async def _run_io(self, fn, *args):
+        """Run ``fn`` on the history executor: it reads or writes the history store, memory index or caches."""
+        return await asyncio.get_running_loop().run_in_executor(self._io_executor, in_context(fn, *args))
+
+    async def asave_to_history(self, role: str, message: str, session_id: str = DEFAULT_SESSION) -> None:
+        await self._run_io(self.save_to_history, role, message, session_id)
+
+    def _schedule_summary(self, session_id: str) -> None:
+        self.summarizer.schedule(self.sessions.get(session_id))
 
-            Please provide a therapeutic response that:
-            1. Shows understanding of the user's message
-            2. References relevant parts of the conversation history
-            3. Incorporates helpful information from search results
-            4. Maintains a warm and professional tone
-            """
+    def _turn_context(self, user_input: str, session_id: str, search_results: List[Dict]) -> Tuple[str, List]:
+        # A cold session loads from the store and memory may rebuild its index; one executor hop for both.
+        recent_chat = self.get_recent_messages(session_id=session_id)
+        return recent_chat, self._response_messages(user_input, session_id, search_results)
 
-            response = self.openai.invoke([
-                SystemMessage(content="You are an empathetic AI therapist."),
-                HumanMessage(content=prompt)
-            ])
+    async def asummarize_for_search(self, text: str, max_length: int = 100) -> str:
+        try:
+            with span("text", "llm.search_query"):
+                response = await self.openai.ainvoke(self._summary_messages(text, max_length))
+            summary = response.content.strip()
+            return summary[:max_length]
+
+        except Exception as e:
+            print(f"Summarization error: {e}")
+            return text[:max_length]
+
+    async def abuild_search_query(self, text: str, max_length: int = 100) -> str:
+        if self.search_query_mode == "llm":
+            return await self.asummarize_for_search(text, max_length)
+        return extract_search_query(text, max_length)
+
+    async def _asearch(self, search_query: str, max_results: int) -> List[Dict]:
+        print(f"Searching for: {search_query}")
+
+        # DDGS has no stable async API across releases; keep it off the event loop
+        # and off Starlette's threadpool with a dedicated, bounded executor.
+        with span("text", "search.upstream"):
+            raw_results = await asyncio.get_running_loop().run_in_executor(
+                self._search_executor, partial(self.ddg.text, search_query, max_results=max_results)
+            )
+        results = self._format_results(raw_results)
+        # May save the cache file.
+        await self._run_io(self.search_cache.put_results, search_query, max_results, results)
+        return results
+
+    async def asearch_duckduckgo(self, query: str, max_results: int = 3) -> List[Dict]:
+        with span("text", "search"):
+            return await self._asearch_duckduckgo(query, max_results)
+
+    async def _asearch_duckduckgo(self, query: str, max_results: int) -> List[Dict]:
+        try:
+            search_query = await self.abuild_search_query(query)
+
+            cached = self.search_cache.get_results(search_query, max_results)
+            if cached is not None:
+                return cached
+
+            # Users asking about the same topic at once share one DDG request.
+            return await self.search_flight.ado(
+                self.search_cache.key(search_query, max_results), self._asearch, search_query, max_results
+            )
+
+        except Exception as e:
+            print(f"Search error: {e}")
+            return []
+
+    async def aprocess_message(self, user_input: str, session_id: str = DEFAULT_SESSION) -> Dict:
+        with span("text", "turn"):
+            return await self._aprocess_message(user_input, session_id)
+
+    async def _aprocess_message(self, user_input: str, session_id: str) -> Dict:
+        try:
+            await self.asave_to_history("User", user_input, session_id)
+
+            search_results = await self.asearch_duckduckgo(user_input)
+
+            recent_chat, messages = await self._run_io(self._turn_context, user_input, session_id, search_results)
+            with span("text", "llm"):
+                response = await self.openai.ainvoke(messages)
 
             response_text = response.content
-            self.save_to_history("Assistant", response_text)
+            await self.asave_to_history("Assistant", response_text, session_id)
+            await self._run_io(self._schedule_summary, session_id)
 
             return {
                 "response": response_text,
@@ -129,6 +288,35 @@ class TextTherapyService:
                 "details": str(e)
             }
 
+    def metric_samples(self) -> List:
+        labels = {"service": "text"}
+        return (
+            stats_samples("chatbot_cache", {**labels, "cache": "search"}, self.search_cache.stats())
+            + stats_samples("chatbot_cache", {**labels, "cache": "sessions"}, self.sessions.stats())
+            + stats_samples("chatbot_coalescing", {**labels, "call": "search"}, self.search_flight.stats())
+        )
+
+    async def astream_message(self, user_input: str, session_id: str = DEFAULT_SESSION) -> AsyncIterator[str]:
+        """
+        Yield response tokens as the model produces them. The assembled answer
+        is saved only when the stream runs to completion; closing the generator
+        early cancels the upstream call.
+        """
+        await self.asave_to_history("User", user_input, session_id)
+
+        search_results = await self.asearch_duckduckgo(user_input)
+
+        chunks = []
+        messages = await self._run_io(self._response_messages, user_input, session_id, search_results)
+        with span("text", "llm.stream"):
+            async for chunk in self.openai.astream(messages):
+                if chunk.content:
+                    chunks.append(chunk.content)
+                    yield chunk.content
+
+        await self.asave_to_history("Assistant", "".join(chunks), session_id)
+        await self._run_io(self._schedule_summary, session_id)
+
 
 def main():
     # Initialize service
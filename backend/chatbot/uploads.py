@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, Optional, TypedDict
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """File extension for the image format ``head`` starts with, or None."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for signature, extension in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UnsupportedUpload(ValueError):
+    pass
+
+
+class StoredUpload(TypedDict):
+    digest: str
+    path: str
+    size: int
+    duplicate: bool
+
+
+class UploadStore:
+    """
+    Content-addressed upload directory. Files are stored once per content
+    hash as ``<dir>/<d[:2]>/<d[2:4]>/<digest>.<ext>``.
+
+    ``save`` copies the upload to a temp file in fixed-size chunks, hashing
+    as it goes, then renames it into place. So saving costs the same however
+    many files are stored, and concurrent uploads never share a name.
+    Storing an identical file again just refreshes its mtime, which is the
+    age that ``cleanup`` compares against the retention period. Directories
+    are created by the first ``save``, so building a store has no side effects.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, chunk_size: int = 64 * 1024,
+                 retention: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.retention = retention
+        self.uploads = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.removed = 0
+        self._lock = threading.Lock()
+        self._tmp_dir = os.path.join(directory, "tmp")
+        self._created = False
+
+    def path_for(self, digest: str, extension: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest[2:4], f"{digest}.{extension}")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def save(self, source: BinaryIO) -> StoredUpload:
+        """Store the image read from ``source``; blocking, so call it from a worker thread."""
+        if not self._created:
+            os.makedirs(self._tmp_dir, exist_ok=True)
+            self._created = True
+        digest = hashlib.blake2b(digest_size=20)
+        tmp_path = os.path.join(self._tmp_dir, f"{uuid.uuid4().hex}.part")
+        size = 0
+        extension = None
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in iter(lambda: source.read(self.chunk_size), b""):
+                    if extension is None:
+                        extension = sniff_image_type(chunk)
+                        if extension is None:
+                            raise UnsupportedUpload("Upload is not a JPEG, PNG, GIF, BMP or WebP image")
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+            if extension is None:
+                raise UnsupportedUpload("Upload is empty")
+
+            path = self.path_for(digest.hexdigest(), extension)
+            duplicate = os.path.exists(path)
+            if duplicate:
+                os.utime(path)
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            self._count("rejected")
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._count("duplicates" if duplicate else "uploads")
+        return {"digest": digest.hexdigest(), "path": path, "size": size, "duplicate": duplicate}
+
+    def cleanup(self, max_age: Optional[float] = None) -> int:
+        """
+        Remove files not uploaded again within ``max_age`` seconds (default:
+        the store's retention), plus temp files abandoned by crashed uploads.
+        """
+        max_age = self.retention if max_age is None else max_age
+        now = time.time()
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            is_tmp = root == self._tmp_dir
+            if max_age is None and not is_tmp:
+                continue
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    age = now - os.stat(path).st_mtime
+                    if age > (3600 if is_tmp else max_age):
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        with self._lock:
+            self.removed += removed
+        return removed
+
+    async def run_retention(self, interval: float = 3600) -> None:
+        """Periodic ``cleanup`` for the app's lifetime; start it as a background task."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await asyncio.to_thread(self.cleanup)
+                if removed:
+                    print(f"Removed {removed} expired uploads from {self.directory}")
+            except OSError as e:
+                print(f"Upload cleanup error: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "uploads": self.uploads,
+                "duplicates": self.duplicates,
+                "rejected": self.rejected,
+                "removed": self.removed,
+                "max_bytes": self.max_bytes,
+                "retention_seconds": self.retention
+            }
+
+
+def get_upload_store(directory: Optional[str] = None) -> UploadStore:
+    # Uploads are kept indefinitely unless UPLOAD_RETENTION_DAYS is set.
+    retention_days = float(os.getenv("UPLOAD_RETENTION_DAYS", "0"))
+    return UploadStore(
+        directory or os.getenv("UPLOAD_DIR", "./data/user/first_impression"),
+        max_bytes=int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024))),
+        chunk_size=int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024))),
+        retention=retention_days * 86400 if retention_days > 0 else None
+    )
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping request bodies per path; ``limits`` maps each
+    upload path to its maximum size in bytes. A declared
+    Content-Length over the limit is refused with 413 before any of the body
+    is read, and a body that grows past the limit is cut off while it is
+    being received, so oversized uploads are never spooled. ``overhead``
+    leaves room for multipart headers and boundaries around the file.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], overhead: int = 16 * 1024):
+        self.app = app
+        self.limits = {path: max_bytes + overhead for path, max_bytes in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+            response = JSONResponse({"error": f"Upload exceeds {max_bytes} bytes"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # FastAPI turns other errors raised while parsing the body into a 400.
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,25 +1,80 @@
-import sys
+import asyncio
+import os
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from api.endpoints import router
-from chatbot.text.endpoints import text_service_router
+from api.endpoints import impression_store, router
+from chatbot.clients import clients
+from chatbot.sessions import issue_session_cookie
+from chatbot.telemetry import CONTENT_TYPE, registry, trace_requests
+from chatbot.text.endpoints import text_service, text_service_router
+from chatbot.uploads import UploadSizeLimit
 
-
-app = FastAPI()
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1").lower() in ("1", "true", "yes")
 
 origins = [
     "*",
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(router, prefix="/api")
-app.include_router(text_service_router, prefix="/text-service")
+async def warm_up():
+    """Build the text service and pre-connect to its upstreams before the first request needs them."""
+    try:
+        await text_service.aget()
+        await clients.start()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+
+def create_app() -> FastAPI:
+    """
+    Registers routes and middleware only. Heavy subsystems are built by a
+    background warm-up task after startup (WARMUP_ON_STARTUP=0 disables it)
+    or by the first request that needs them.
+    """
+    app = FastAPI()
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Trace-Id", "X-Session-ID"],
+    )
+    app.middleware("http")(trace_requests)
+    app.middleware("http")(issue_session_cookie)
+    app.add_middleware(UploadSizeLimit, limits={"/api/user/impression": impression_store.max_bytes})
+
+    app.include_router(router, prefix="/api")
+    app.include_router(text_service_router, prefix="/text-service")
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+    @app.on_event("startup")
+    async def start_warm_up():
+        if WARMUP_ON_STARTUP:
+            app.state.warm_up = asyncio.create_task(warm_up())
+        if impression_store.retention:
+            app.state.upload_retention = asyncio.create_task(impression_store.run_retention())
+
+    @app.on_event("shutdown")
+    async def close_upstream_clients():
+        await clients.aclose()
+
+    @app.on_event("shutdown")
+    def close_history():
+        service = text_service.peek()
+        if service:
+            service.history.close()
+
+    return app
+
+
+registry.register_collector(clients.metric_samples)
+
+app = create_app()
@@ -0,0 +1,93 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from chatbot.speach.audio_delivery import build_audio_response, negotiate_format, parse_range
+
+AUDIO = bytes(range(256)) * 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=990-5000", (990, 999)),
+    ("bytes=0-1,5-6", None),
+    ("bytes=-", None),
+    ("items=0-10", None),
+    ("bytes=50-10", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header, size", [("bytes=1000-", 1000), ("bytes=-0", 1000), ("bytes=0-", 0)])
+def test_unsatisfiable_ranges_raise(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.mark.parametrize("requested, accept, expected", [
+    ("mp3", "audio/wav", "mp3"),
+    ("pcm", None, "wav"),
+    (None, None, "wav"),
+    (None, "audio/mpeg", "mp3"),
+    (None, "audio/wav;q=0.5, audio/ogg;q=0.9", "opus"),
+    (None, "audio/mpeg;q=0, audio/x-wav;q=0.1", "wav"),
+    (None, "audio/mpeg;q=0", "wav"),
+    (None, "audio/ogg;q=oops, audio/mp3;q=0.2", "mp3"),
+    (None, "text/html, AUDIO/MPEG", "mp3"),
+])
+def test_negotiate_format(requested, accept, expected):
+    assert negotiate_format(requested, accept) == expected
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/audio")
+    async def audio(request: Request):
+        return build_audio_response(AUDIO, "mp3", request.headers.get("range"))
+
+    return TestClient(app)
+
+
+def test_full_response(client):
+    response = client.get("/audio")
+    assert response.status_code == 200
+    assert response.content == AUDIO
+    assert response.headers["content-length"] == str(len(AUDIO))
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "audio/mpeg"
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-0", 0, 0),
+    ("bytes=70000-", 70000, len(AUDIO) - 1),
+    ("bytes=-10", len(AUDIO) - 10, len(AUDIO) - 1),
+    # Spans several 64 KiB chunks.
+    ("bytes=1000-200000", 1000, 200000),
+])
+def test_partial_responses(client, header, start, end):
+    response = client.get("/audio", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == AUDIO[start:end + 1]
+    assert response.headers["content-length"] == str(end - start + 1)
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(AUDIO)}"
+
+
+def test_unsatisfiable_range_is_416(client):
+    response = client.get("/audio", headers={"Range": f"bytes={len(AUDIO)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(AUDIO)}"
+    assert response.content == b""
+
+
+def test_multi_range_gets_the_whole_body(client):
+    response = client.get("/audio", headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.content == AUDIO
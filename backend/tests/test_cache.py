@@ -0,0 +1,64 @@
+import time
+
+from chatbot.cache import DiskCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    evicted = []
+    cache = TTLCache(max_entries=2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert evicted == ["b"]
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries_and_counts_lookups():
+    cache = TTLCache(ttl=0.05)
+    cache.put("short", 1)
+    cache.put("long", 2, ttl=10)
+    assert cache.get("short") == 1
+    time.sleep(0.06)
+
+    assert cache.get("short", "gone") == "gone"
+    assert "short" not in cache
+    assert cache.get("long") == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert [key for key, _, _ in cache.snapshot()] == ["long"]
+
+
+def test_sliding_ttl_is_an_idle_timeout():
+    cache = TTLCache(ttl=0.1, sliding=True)
+    cache.put("session", "state")
+    for _ in range(4):
+        time.sleep(0.04)
+        assert cache.get("session") == "state"
+    time.sleep(0.12)
+    assert cache.get("session") is None
+
+
+def test_pop_and_clear():
+    cache = TTLCache()
+    cache.put("a", 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a", "missing") == "missing"
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_disk_cache_round_trip_and_size_bound(tmp_path):
+    cache = DiskCache(str(tmp_path / "tts"), max_bytes=1000)
+    keys = [f"{i:02x}" + "0" * 38 for i in range(5)]
+    for key in keys:
+        cache.put(key, bytes(300))
+        time.sleep(0.01)
+
+    assert cache.get(keys[-1]) == bytes(300)
+    assert cache.get(keys[0]) is None
+    assert sum(cache.path_for(key, count=False) is not None for key in keys) <= 3
+    assert cache.stats()["evictions"] >= 2
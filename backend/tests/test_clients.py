@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from chatbot.clients import PooledTransport, _Slots
+
+
+def test_sync_and_async_callers_share_one_budget():
+    slots = _Slots(3)
+    peak = []
+
+    def hold():
+        peak.append(slots.in_flight)
+
+    def sync_worker():
+        for _ in range(30):
+            slots.acquire()
+            hold()
+            time.sleep(0.0005)
+            slots.release()
+
+    async def async_worker():
+        for _ in range(30):
+            await slots.aacquire()
+            hold()
+            await asyncio.sleep(0.0005)
+            slots.arelease()
+
+    async def run_async():
+        await asyncio.gather(*(async_worker() for _ in range(4)))
+
+    threads = [threading.Thread(target=sync_worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    asyncio.run(run_async())
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) <= 3
+    assert slots.stats()["requests"] == 240
+    assert slots.in_flight == 0
+
+
+def test_slot_is_released_when_body_is_read_without_close():
+    slots = _Slots(1)
+    transport = PooledTransport(slots, httpx.Limits(), http2=False)
+    transport._transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"audio"))
+
+    response = transport.handle_request(httpx.Request("GET", "https://example.com"))
+    assert slots.in_flight == 1
+    assert b"".join(response.stream) == b"audio"
+    assert slots.in_flight == 0
+
+
+def test_cancelled_waiter_hands_its_wakeup_to_the_next_one():
+    async def scenario():
+        slots = _Slots(1)
+        await slots.aacquire()
+        first = asyncio.create_task(slots.aacquire())
+        second = asyncio.create_task(slots.aacquire())
+        await asyncio.sleep(0)
+
+        # The release picks the first waiter, which is cancelled before its wakeup runs.
+        slots.release()
+        first.cancel()
+        await asyncio.wait_for(second, timeout=1)
+        assert first.cancelled()
+        assert slots.in_flight == 1
+        slots.release()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_queued_waiter_leaves_the_queue():
+    async def scenario():
+        slots = _Slots(1)
+        await slots.aacquire()
+        waiter = asyncio.create_task(slots.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert not slots._async_waiters
+        slots.release()
+        await asyncio.wait_for(slots.aacquire(), timeout=1)
+
+    asyncio.run(scenario())
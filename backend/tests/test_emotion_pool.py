@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from chatbot.speach.emotion_pool import EmotionPoolUnavailable, EmotionWorkerPool
+
+
+class BrokenExecutor(Executor):
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_worker_pool_is_marked_unavailable():
+    pool = EmotionWorkerPool(workers=1, max_batch_size=4, max_wait_ms=1, detector_backend="opencv")
+    executor = BrokenExecutor()
+    pool._executor = executor
+    pool.ready = True
+
+    async def analyze_two():
+        image = np.zeros((8, 8, 3), dtype=np.uint8)
+        return await asyncio.gather(pool.analyze(image), pool.analyze(image), return_exceptions=True)
+
+    results = asyncio.run(analyze_two())
+
+    assert all(isinstance(result, EmotionPoolUnavailable) for result in results)
+    assert executor.shut_down
+    status = pool.status()
+    assert status["ready"] is False
+    assert "terminated abruptly" in status["error"]
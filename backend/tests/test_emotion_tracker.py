@@ -0,0 +1,16 @@
+import subprocess
+import sys
+
+from chatbot.speach.emotion_tracker import EmotionTracker
+
+
+def test_importing_the_tracker_does_not_load_opencv():
+    code = "import sys, chatbot.speach.emotion_tracker; print('cv2' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_explicit_zero_settings_are_kept(monkeypatch):
+    monkeypatch.setenv("EMOTION_SMOOTHING", "0.9")
+    tracker = EmotionTracker(alpha=0, diff_threshold=0, max_age=0)
+    assert (tracker.alpha, tracker.diff_threshold, tracker.max_age) == (0, 0, 0)
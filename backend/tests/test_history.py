@@ -0,0 +1,43 @@
+import json
+import os
+import time
+
+from chatbot.history import JsonlHistoryStore, SqliteHistoryStore, migrate_json_history
+
+
+def _write_legacy(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f)
+
+
+def test_migration_imports_into_an_empty_store(tmp_path):
+    legacy = str(tmp_path / "chat_history.json")
+    _write_legacy(legacy, [{"role": "User", "message": "hi"}, {"role": "Bot", "message": "hello"}])
+    store = SqliteHistoryStore(str(tmp_path / "history.db"))
+
+    assert migrate_json_history(store, legacy) == 2
+    assert [record["message"] for record in store.recent("default")] == ["hi", "hello"]
+    assert os.path.exists(legacy + ".migrated") and not os.path.exists(legacy)
+
+
+def test_migration_leaves_the_file_when_the_store_has_history(tmp_path):
+    legacy = str(tmp_path / "chat_history.json")
+    _write_legacy(legacy, [{"role": "User", "message": "old"}])
+    store = SqliteHistoryStore(str(tmp_path / "history.db"))
+    store.append("someone", {"role": "User", "message": "new"})
+
+    assert migrate_json_history(store, legacy) == 0
+    assert os.path.exists(legacy)
+    assert store.count() == 1
+
+
+def test_jsonl_store_syncs_a_lone_append_without_another_write(tmp_path):
+    store = JsonlHistoryStore(str(tmp_path / "history.jsonl"), fsync_every=100, fsync_interval=0.05)
+    store.append("s", {"role": "User", "message": "only"})
+    assert store._pending == 1
+
+    deadline = time.monotonic() + 2
+    while store._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store._pending == 0
+    store.close()
@@ -0,0 +1,45 @@
+import multiprocessing
+
+import numpy as np
+
+from chatbot.memory import HashedTfidfEmbedder, MemoryIndex
+
+
+def _write_turns(path: str, worker: int, turns: int) -> None:
+    index = MemoryIndex.load(HashedTfidfEmbedder(256), path)
+    for turn in range(turns):
+        index.add({"text": f"worker {worker} says turn number {turn} about topic{worker}x{turn}", "timestamp": None})
+
+
+def test_concurrent_writers_keep_texts_and_vectors_aligned(tmp_path):
+    embedder = HashedTfidfEmbedder(256)
+    path = str(tmp_path / "session")
+    MemoryIndex.build(embedder, path, [])
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_turns, args=(path, worker, 50)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    index = MemoryIndex.load(embedder, path)
+    assert len(index) == 200
+    assert len({record["text"] for record in index.records}) == 200
+    expected = embedder.embed([record["text"] for record in index.records]).astype(np.float16).astype(np.float32)
+    assert np.allclose(index._vectors[:len(index)], expected)
+
+
+def test_index_sees_turns_appended_by_another_process_and_stays_bounded(tmp_path):
+    embedder = HashedTfidfEmbedder(256)
+    path = str(tmp_path / "session")
+    reader = MemoryIndex.build(embedder, path, [], max_records=40)
+    writer = MemoryIndex.load(embedder, path, max_records=40)
+
+    for turn in range(100):
+        writer.add({"text": f"turn {turn} mentions the lighthouse{turn}", "timestamp": None})
+
+    assert reader.search("lighthouse99", k=1)[0][1]["text"] == "turn 99 mentions the lighthouse99"
+    assert len(MemoryIndex.load(embedder, path, max_records=40)) <= 50
+    assert len(writer) <= 50
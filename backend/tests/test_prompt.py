@@ -0,0 +1,49 @@
+import threading
+import time
+
+from chatbot import prompt
+from chatbot.prompt import PromptBuilder, count_tokens
+
+
+def test_an_over_long_newest_line_is_truncated_not_dropped():
+    prompt = (
+        PromptBuilder(60)
+        .add("User's message: hi", priority=3)
+        .add_lines("Recent conversation:", ["User: earlier", "Bot: " + "very long reply " * 100], priority=2)
+        .build()
+    )
+    header, _, recent = prompt.partition("\n\n")
+    assert header == "User's message: hi"
+    assert recent.startswith("Recent conversation:\nBot: very long reply")
+    assert "User: earlier" not in recent
+    assert count_tokens(prompt) <= 60
+
+
+def test_reserved_text_counts_against_the_budget():
+    lines = [f"User: message number {i}" for i in range(50)]
+    full = PromptBuilder(200).add_lines("Recent conversation:", lines).build()
+    reserved = PromptBuilder(200).reserve("system " * 100).add_lines("Recent conversation:", lines).build()
+
+    assert count_tokens(reserved) <= 200 - count_tokens("system " * 100)
+    assert len(reserved.splitlines()) < len(full.splitlines())
+    assert reserved.splitlines()[-1] == lines[-1]
+
+
+def test_encoding_is_loaded_once_under_concurrent_callers(monkeypatch):
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.05)
+        return None
+
+    monkeypatch.setattr(prompt, "_encoding_loaded", False)
+    monkeypatch.setattr(prompt, "_encoding_value", None)
+    monkeypatch.setattr(prompt, "_load_encoding", slow_load)
+    threads = [threading.Thread(target=count_tokens, args=("hello there",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
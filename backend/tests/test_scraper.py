@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "chatbot"))
+
+import pytest
+
+import scraper
+from benchmarks.fakes import HtmlFixtureServer
+
+
+@pytest.fixture
+def web_scraper():
+    web_scraper = scraper.WebScraper(max_workers=4, per_host_limit=2, timeout=2.0)
+    yield web_scraper
+    web_scraper.executor.shutdown()
+    web_scraper.session.close()
+
+
+def test_scrape_content_extracts_article_text_and_caches_it(web_scraper):
+    with HtmlFixtureServer() as server:
+        content = web_scraper.scrape_content(server.url(3))
+    assert content.startswith("Paragraph 0 of page 3.")
+    assert "tracking" not in content and "Footer" not in content
+    assert len(content) <= 2000
+
+    # Fresh cache entries are served without a request, so a stopped server does not matter.
+    assert web_scraper.scrape_content(server.url(3)) == content
+
+
+def test_scrape_content_reports_error_statuses(web_scraper):
+    with HtmlFixtureServer() as server:
+        assert web_scraper.scrape_content(f"{server.base_url}/missing") == "Failed to retrieve the webpage."
+
+
+def test_scrape_many_keeps_order_and_releases_host_slots(web_scraper):
+    with HtmlFixtureServer(latency=0.02) as server:
+        urls = [server.url(i) for i in range(6)]
+        results = web_scraper.scrape_many(urls + urls[:2], deadline=10)
+
+    assert list(results) == urls
+    assert all(results[url].startswith(f"Paragraph 0 of page {i}.") for i, url in enumerate(urls))
+    assert web_scraper._host_slots == {}
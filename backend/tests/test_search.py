@@ -0,0 +1,16 @@
+from chatbot.search import SearchCache
+
+
+def test_cached_results_are_not_shared_with_callers(monkeypatch):
+    monkeypatch.delenv("SEARCH_CACHE_PATH", raising=False)
+    cache = SearchCache()
+    results = [{"title": "Sleep tips", "body": "Keep a routine."}]
+    cache.put_results("sleep tips", 3, results)
+    results[0]["title"] = "changed after put"
+
+    hit = cache.get_results("sleep tips", 3)
+    hit.append({"title": "extra"})
+    hit[0]["body"] = "changed after get"
+
+    assert cache.get_results("sleep tips", 3) == [{"title": "Sleep tips", "body": "Keep a routine."}]
+    assert cache.get_results("other", 3) is None
@@ -0,0 +1,68 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.fakes import FakeChatModel, FakeDDGS
+from chatbot.sessions import SESSION_COOKIE, issue_session_cookie
+from chatbot.text.endpoints import get_text_service, text_service_router
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("CHAT_HISTORY_PATH", str(tmp_path / "chat_history.db"))
+    from chatbot.text.main import TextTherapyService
+
+    service = TextTherapyService()
+    service.openai = FakeChatModel(response="I hear you.")
+    service.summarizer.llm = FakeChatModel()
+    service.ddg = FakeDDGS()
+    return service
+
+
+@pytest.fixture
+def app(service):
+    app = FastAPI()
+    app.middleware("http")(issue_session_cookie)
+    app.include_router(text_service_router, prefix="/text-service")
+    app.dependency_overrides[get_text_service] = lambda: service
+    return app
+
+
+def test_clients_without_session_ids_get_separate_histories(app, service):
+    with TestClient(app) as alice, TestClient(app) as bob:
+        first = alice.post("/text-service/user/input", json={"text": "I miss my sister."})
+        bob.post("/text-service/user/input", json={"text": "Work has been overwhelming."})
+        alice.post("/text-service/user/input", json={"text": "We used to talk every day."})
+
+        alice_id = alice.cookies.get(SESSION_COOKIE)
+        bob_id = bob.cookies.get(SESSION_COOKIE)
+
+    assert first.headers["X-Session-ID"] == alice_id
+    assert alice_id and bob_id and alice_id != bob_id
+
+    alice_messages = [m["message"] for m in service.sessions.recent(alice_id, 10) if m["role"] == "User"]
+    bob_messages = [m["message"] for m in service.sessions.recent(bob_id, 10) if m["role"] == "User"]
+    assert alice_messages == ["I miss my sister.", "We used to talk every day."]
+    assert bob_messages == ["Work has been overwhelming."]
+
+
+def test_known_session_id_is_not_reissued(app):
+    with TestClient(app) as client:
+        response = client.post("/text-service/user/input", json={"text": "Hello"},
+                               headers={"X-Session-ID": "0b5c2f7e-3d41-4a8e-9c1f-6e2d8a4b7c90"})
+
+    assert "set-cookie" not in response.headers
+    assert "X-Session-ID" not in response.headers
+
+
+@pytest.mark.parametrize("session_id", ["default", "short", "has spaces in it!!"])
+def test_reserved_and_guessable_session_ids_are_replaced(app, service, session_id):
+    service.sessions.append("default", {"role": "User", "message": "migrated legacy message", "timestamp": None})
+    with TestClient(app) as client:
+        response = client.post("/text-service/user/input", json={"text": "Hello"},
+                               headers={"X-Session-ID": session_id})
+
+    issued = response.headers["X-Session-ID"]
+    assert issued != session_id
+    assert [m["message"] for m in service.sessions.recent(issued, 10) if m["role"] == "User"] == ["Hello"]
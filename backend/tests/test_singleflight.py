@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from chatbot.singleflight import SingleFlight
+
+
+def test_do_runs_once_for_concurrent_callers_and_shares_the_result():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def fetch(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.05)
+        return {"value": value}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", fetch, 1)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", fetch, 2))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [{"value": 1}] * 4
+    assert flight.stats()["coalesced"] == 3
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_do_hands_the_error_to_every_caller_and_forgets_the_call():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ConnectionError("upstream down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call)
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flight.stats()["errors"] == 1
+    # A failed call is not remembered: the next caller runs it again.
+    assert flight.do("k", lambda: "recovered") == "recovered"
+
+
+def test_do_follower_timeout():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("k", lambda: (started.set(), release.wait())))
+    leader.start()
+    started.wait()
+    with pytest.raises(TimeoutError):
+        flight.do("k", lambda: None, timeout=0.01)
+    release.set()
+    leader.join()
+
+
+def test_ado_coalesces_and_propagates_errors_to_all_joiners():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("bad response")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.ado("k", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert calls == [1]
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["errors"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_ado_cancelled_joiner_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "audio"
+
+    async def scenario():
+        impatient = asyncio.create_task(flight.ado("k", fetch))
+        patient = asyncio.create_task(flight.ado("k", fetch))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient, impatient
+
+    result, impatient = asyncio.run(scenario())
+    assert result == "audio"
+    assert impatient.cancelled()
+    assert flight.stats()["cancelled"] == 0
+
+
+def test_ado_abandons_the_call_once_every_waiter_is_gone():
+    flight = SingleFlight()
+    cancelled = []
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "never"
+
+    async def quick():
+        calls.append(2)
+        return "fresh"
+
+    async def scenario():
+        waiters = [asyncio.create_task(flight.ado("k", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        # An abandoned flight is not joined; a new caller starts over.
+        return await flight.ado("k", quick)
+
+    assert asyncio.run(scenario()) == "fresh"
+    assert cancelled == [True]
+    assert calls == [1, 2]
+    assert flight.stats()["cancelled"] == 1
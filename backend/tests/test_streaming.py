@@ -0,0 +1,86 @@
+import io
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chatbot.speach.streaming import SentenceSplitter, pipeline_tts, streaming_wav_header
+
+
+def split(text, min_chars=1, token_size=1):
+    splitter = SentenceSplitter(min_chars=min_chars)
+    sentences = []
+    for i in range(0, len(text), token_size):
+        sentences.extend(splitter.feed(text[i:i + token_size]))
+    rest = splitter.flush()
+    return sentences + ([rest] if rest else [])
+
+
+@pytest.mark.parametrize("token_size", [1, 3, 1000])
+def test_splits_on_sentence_ends_however_the_text_is_tokenized(token_size):
+    text = 'It is hard. Why now? Because "it matters!" Okay\nNext line'
+    assert split(text, token_size=token_size) == ["It is hard.", "Why now?", 'Because "it matters!"', "Okay",
+                                                  "Next line"]
+
+
+@pytest.mark.parametrize("token_size", [1, 1000])
+def test_abbreviations_do_not_end_sentences(token_size):
+    text = "I saw Dr. Smith, e.g. on Mon. Then I left. See item No. 5 today. I said no. Then it was fine."
+    assert split(text, token_size=token_size) == [
+        "I saw Dr. Smith, e.g. on Mon.", "Then I left.", "See item No. 5 today.", "I said no.", "Then it was fine."
+    ]
+
+
+def test_short_sentences_are_merged_with_the_next():
+    assert split("Yes. I agree. That sounds like a good plan to me.", min_chars=24) == [
+        "Yes. I agree. That sounds like a good plan to me."
+    ]
+    assert split("Okay. That sounds like a good plan. Hi.", min_chars=12) == [
+        "Okay. That sounds like a good plan.", "Hi."
+    ]
+
+
+def test_sentence_end_without_following_text_waits_for_flush():
+    splitter = SentenceSplitter(min_chars=1)
+    assert splitter.feed("All done.") == []
+    assert splitter.flush() == "All done."
+    assert splitter.flush() is None
+
+
+def test_wav_header_with_known_size_is_readable():
+    data = bytes(range(200)) * 2
+    with wave.open(io.BytesIO(streaming_wav_header(sample_rate=24000, data_size=len(data)) + data)) as f:
+        assert (f.getnchannels(), f.getsampwidth(), f.getframerate()) == (1, 2, 24000)
+        assert f.readframes(f.getnframes()) == data
+
+
+def test_streaming_wav_header_marks_unknown_length():
+    header = streaming_wav_header()
+    assert len(header) == 44
+    assert header[4:8] == header[40:44] == b"\xff\xff\xff\xff"
+
+
+def test_pipeline_tts_yields_audio_in_sentence_order_while_synthesizing_concurrently():
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def synthesize(sentence):
+        with lock:
+            active.append(sentence)
+            peak.append(len(active))
+        # Earlier sentences take longer, so completion order is reversed.
+        time.sleep(0.05 if sentence.startswith("First") else 0.01)
+        with lock:
+            active.remove(sentence)
+        return None if sentence.startswith("Silent") else sentence.encode()
+
+    tokens = "First sentence here. Second sentence here. Silent sentence here. Last words".split(" ")
+    tokens = [token + " " for token in tokens]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        audio = list(pipeline_tts(tokens, synthesize, executor, SentenceSplitter(min_chars=1)))
+
+    assert audio == [b"First sentence here.", b"Second sentence here.", b"Last words"]
+    assert max(peak) > 1
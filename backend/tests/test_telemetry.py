@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from chatbot.telemetry import STAGE_ERRORS, Registry, span
+
+
+def test_collector_families_are_rendered_contiguously():
+    registry = Registry()
+    registry.register_collector(lambda: [
+        ("chatbot_cache_hits_total", "counter", {"cache": "search"}, 3),
+        ("chatbot_cache_misses_total", "counter", {"cache": "search"}, 1),
+    ])
+    registry.register_collector(lambda: [("chatbot_cache_hits_total", "counter", {"cache": "sessions"}, 5)])
+
+    lines = registry.render().splitlines()
+
+    assert lines.count("# TYPE chatbot_cache_hits_total counter") == 1
+    start = lines.index("# TYPE chatbot_cache_hits_total counter")
+    assert lines[start + 1:start + 3] == [
+        'chatbot_cache_hits_total{cache="search"} 3',
+        'chatbot_cache_hits_total{cache="sessions"} 5',
+    ]
+
+
+def test_cancelled_span_is_not_an_error():
+    with pytest.raises(asyncio.CancelledError):
+        with span("test", "cancelled"):
+            raise asyncio.CancelledError
+    with pytest.raises(ValueError):
+        with span("test", "failed"):
+            raise ValueError
+
+    assert ("test", "cancelled") not in STAGE_ERRORS._values
+    assert STAGE_ERRORS._values[("test", "failed")] == 1
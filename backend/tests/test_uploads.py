@@ -0,0 +1,76 @@
+import io
+import os
+import time
+
+import pytest
+
+from chatbot.uploads import UnsupportedUpload, UploadStore, UploadTooLarge, sniff_image_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(100)
+JPEG = b"\xff\xd8\xff\xe0" + bytes(100)
+
+
+@pytest.mark.parametrize("head, expected", [
+    (PNG, "png"),
+    (JPEG, "jpg"),
+    (b"GIF89a...", "gif"),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "webp"),
+    (b"%PDF-1.7", None),
+])
+def test_sniff_image_type(head, expected):
+    assert sniff_image_type(head) == expected
+
+
+def test_store_is_content_addressed_and_counts_duplicates(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"), max_bytes=1024, chunk_size=16)
+    assert not os.path.exists(store.directory)
+
+    first = store.save(io.BytesIO(PNG))
+    again = store.save(io.BytesIO(PNG))
+    other = store.save(io.BytesIO(JPEG))
+
+    assert first["path"] == again["path"] and first["path"].endswith(".png")
+    assert (first["duplicate"], again["duplicate"], other["duplicate"]) == (False, True, False)
+    assert first["size"] == len(PNG)
+    with open(first["path"], "rb") as f:
+        assert f.read() == PNG
+    assert store.stats()["uploads"] == 2 and store.stats()["duplicates"] == 1
+
+
+@pytest.mark.parametrize("data, error", [
+    (PNG + bytes(2000), UploadTooLarge),
+    (b"not an image at all", UnsupportedUpload),
+    (b"", UnsupportedUpload),
+])
+def test_rejected_uploads_leave_no_files(tmp_path, data, error):
+    store = UploadStore(str(tmp_path / "uploads"), max_bytes=1024, chunk_size=64)
+    with pytest.raises(error):
+        store.save(io.BytesIO(data))
+
+    assert store.stats()["rejected"] == 1
+    assert [files for _, _, files in os.walk(store.directory) if files] == []
+
+
+def test_cleanup_removes_expired_uploads_and_stale_temp_files(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"), max_bytes=1024, retention=60)
+    old = store.save(io.BytesIO(PNG))["path"]
+    fresh = store.save(io.BytesIO(JPEG))["path"]
+    stale_tmp = os.path.join(store.directory, "tmp", "abandoned.part")
+    open(stale_tmp, "wb").close()
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+    os.utime(stale_tmp, (past, past))
+
+    assert store.cleanup() == 2
+    assert not os.path.exists(old) and not os.path.exists(stale_tmp)
+    assert os.path.exists(fresh)
+
+
+def test_cleanup_without_retention_keeps_uploads(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"), max_bytes=1024)
+    path = store.save(io.BytesIO(PNG))["path"]
+    past = time.time() - 10 * 86400
+    os.utime(path, (past, past))
+
+    assert store.cleanup() == 0
+    assert os.path.exists(path)
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("python_multipart")
+
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from chatbot.speach import endpoints
+
+
+class StubBot:
+    """Speaks every transcript back as two WAV chunks."""
+
+    def stream_interaction(self, text, session_id=None, reply=None):
+        yield b"RIFF-header"
+        reply.append(f"reply to {text}")
+        yield b"pcm-data"
+
+
+class FailingBot:
+    def stream_interaction(self, text, session_id=None, reply=None):
+        yield b"RIFF-header"
+        raise RuntimeError("LLM unavailable")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("STREAMING_STT_BACKEND", "fake")
+    monkeypatch.delenv("STREAMING_STT_FIXTURE", raising=False)
+    endpoints.router.dependency_overrides[endpoints.get_bot] = StubBot
+    yield TestClient(endpoints.router)
+    endpoints.router.dependency_overrides.clear()
+
+
+def test_ws_audio_sends_transcripts_then_audio_then_the_response(client):
+    with client.websocket_connect("/ws/audio") as ws:
+        for _ in range(15):
+            ws.send_bytes(b"\x00\x00" * 160)
+        ws.send_text("end")
+
+        transcripts = [ws.receive_json() for _ in range(3)]
+        audio = [ws.receive_bytes() for _ in range(2)]
+        response = ws.receive_json()
+
+    assert [event["type"] for event in transcripts] == ["transcript"] * 3
+    assert [event["is_final"] for event in transcripts] == [False, False, True]
+    assert audio == [b"RIFF-header", b"pcm-data"]
+    assert response == {"type": "response", "text": f"reply to {transcripts[-1]['text']}"}
+
+
+def test_ws_audio_disconnect_mid_stream_closes_cleanly(client):
+    with client.websocket_connect("/ws/audio") as ws:
+        for _ in range(7):
+            ws.send_bytes(b"\x00\x00" * 160)
+        assert ws.receive_json()["is_final"] is False
+
+
+def test_ws_audio_closes_with_an_error_when_the_turn_fails(client):
+    endpoints.router.dependency_overrides[endpoints.get_bot] = FailingBot
+    with client.websocket_connect("/ws/audio") as ws:
+        for _ in range(15):
+            ws.send_bytes(b"\x00\x00" * 160)
+
+        assert [ws.receive_json()["is_final"] for _ in range(3)] == [False, False, True]
+        assert ws.receive_bytes() == b"RIFF-header"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1011
@@ -0,0 +1,8 @@
+# The standalone bot uses the backend's cache, so fixes land in one place:
+# backend/chatbot/cache.py.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from chatbot.cache import TTLCache  # noqa: E402,F401
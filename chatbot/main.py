@@ -9,10 +9,9 @@ from deepface import DeepFace
 from deepgram import DeepgramClient, SpeakOptions, PrerecordedOptions
 from playsound import playsound
 import json
-import requests
-from bs4 import BeautifulSoup
-import re
 
+from scraper import WebScraper
+from search import SearchCache, extract_search_query
 
 load_dotenv()
 
@@ -42,31 +41,6 @@ class EmotionState(TypedDict):
     emotion: str
 
 
-class WebScraper:
-    @staticmethod
-    def scrape_content(url):
-        try:
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code != 200:
-                return "Failed to retrieve the webpage."
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            content = []
-            for tag in soup.find_all(['h1', 'h2', 'h3', 'p', 'article']):
-                text = tag.get_text(" ", strip=True)
-                content.append(text)
-
-            content = "\n".join(content)
-            content = re.sub(r'\s+', ' ', content)
-            return content[:2000]
-
-        except Exception as e:
-            print(f"Scraping error: {e}")
-            return None
-
-
 class DeepgramTTS:
     def __init__(self):
         self.filename = "response.wav"
@@ -126,6 +100,8 @@ class EmotionAwareBot:
         self.stt = SpeechToText()
         self.ddg = DDGS()
         self.scraper = WebScraper()
+        self.search_query_mode = os.getenv("SEARCH_QUERY_MODE", "local")
+        self.search_cache = SearchCache()
 
     def process_audio_file(self, audio_path, image_path=None):
         text_query = self.stt.transcribe_file(audio_path)
@@ -183,25 +159,36 @@ class EmotionAwareBot:
             print(f"Summarization error: {e}")
             return text[:max_length]
 
+    def build_search_query(self, text, max_length=100):
+        if self.search_query_mode == "llm":
+            return self.summarize_for_search(text, max_length)
+        return extract_search_query(text, max_length)
+
     def search_duckduckgo(self, query, max_results=3):
         try:
-            search_query = self.summarize_for_search(query)
+            search_query = self.build_search_query(query)
+
+            cached = self.search_cache.get_results(search_query, max_results)
+            if cached is not None:
+                return cached
+
             print(f"Searching for: {search_query}")
 
             results = list(self.ddg.text(search_query, max_results=max_results))
+            contents = self.scraper.scrape_many([r["href"] for r in results if r.get("href")])
             enhanced_results = []
 
             for result in results:
                 url = result.get("href")
-                if url:
-                    content = self.scraper.scrape_content(url)
-                    if content:
-                        enhanced_results.append({
-                            "title": result.get("title", ""),
-                            "url": url,
-                            "content": content
-                        })
-
+                content = contents.get(url)
+                if content:
+                    enhanced_results.append({
+                        "title": result.get("title", ""),
+                        "url": url,
+                        "content": content
+                    })
+
+            self.search_cache.put_results(search_query, max_results, enhanced_results)
             return enhanced_results
 
         except Exception as e:
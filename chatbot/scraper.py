@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import TTLCache
+
+
+class _ExtractionDone(Exception):
+    pass
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Streams text out of headings, paragraphs and articles without building a
+    tree, and stops parsing as soon as enough text has been collected.
+    """
+
+    CONTENT_TAGS = {"h1", "h2", "h3", "p", "article"}
+    SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+    def __init__(self, limit: int):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+        self._content_depth = 0
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.CONTENT_TAGS:
+            self._content_depth += 1
+        elif tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.CONTENT_TAGS and self._content_depth:
+            self._content_depth -= 1
+        elif tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._content_depth or self._skip_depth:
+            return
+        text = " ".join(data.split())
+        if text:
+            self.parts.append(text)
+            self.size += len(text) + 1
+            if self.size >= self.limit:
+                raise _ExtractionDone()
+
+
+def extract_text(html: str, limit: int = 2000) -> str:
+    extractor = _TextExtractor(limit)
+    try:
+        extractor.feed(html)
+        extractor.close()
+    except _ExtractionDone:
+        pass
+    return " ".join(extractor.parts)[:limit]
+
+
+class _HostSlot:
+    def __init__(self, limit: int):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        # Requests holding or waiting for the semaphore; the slot is dropped when this reaches 0.
+        self.users = 0
+
+
+class WebScraper:
+    """
+    Fetches result pages concurrently over one pooled keep-alive session, with
+    a per-host connection limit and a content cache revalidated through
+    ETag / Last-Modified. A host's limit is only tracked while requests to it
+    are in flight, so search results from many hosts do not pile up slots.
+    """
+
+    def __init__(self, max_workers: int = 8, per_host_limit: int = 2, timeout: float = 5.0,
+                 max_bytes: int = 512 * 1024, fresh_for: float = 600.0, cache_entries: int = 256,
+                 session: Optional[requests.Session] = None):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.per_host_limit = per_host_limit
+        self.session = session or requests.Session()
+        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=per_host_limit)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scraper")
+        self.cache = TTLCache(max_entries=cache_entries)
+        self._host_slots: Dict[str, _HostSlot] = {}
+        self._host_slots_lock = threading.Lock()
+
+    @contextmanager
+    def _host_slot(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = _HostSlot(self.per_host_limit)
+            slot.users += 1
+        try:
+            with slot.semaphore:
+                yield
+        finally:
+            with self._host_slots_lock:
+                slot.users -= 1
+                if not slot.users:
+                    del self._host_slots[host]
+
+    def _read_body(self, response: requests.Response) -> str:
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                break
+        return b"".join(chunks).decode(response.encoding or "utf-8", errors="replace")
+
+    def scrape_content(self, url: str) -> Optional[str]:
+        cached = self.cache.get(url)
+        if cached and time.monotonic() - cached["fetched_at"] < self.fresh_for:
+            return cached["content"]
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        try:
+            with self._host_slot(url):
+                with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                    if response.status_code == 304 and cached:
+                        cached["fetched_at"] = time.monotonic()
+                        return cached["content"]
+                    if response.status_code != 200:
+                        return "Failed to retrieve the webpage."
+
+                    content = extract_text(self._read_body(response))
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+
+            self.cache.put(url, {
+                "content": content,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.monotonic()
+            })
+            return content
+
+        except Exception as e:
+            print(f"Scraping error: {e}")
+            return None
+
+    def scrape_many(self, urls: List[str], deadline: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        Scrape all URLs concurrently and return whatever finished before the
+        deadline, in the order the URLs were given.
+        """
+        if deadline is None:
+            deadline = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "6"))
+
+        futures = {url: self.executor.submit(self.scrape_content, url) for url in dict.fromkeys(urls)}
+        done, not_done = wait(futures.values(), timeout=deadline)
+        for future in not_done:
+            future.cancel()
+
+        return {url: future.result() for url, future in futures.items() if future in done}
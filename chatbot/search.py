@@ -0,0 +1,8 @@
+# The standalone bot uses the backend's query extractor and search cache, so
+# fixes land in one place: backend/chatbot/search.py.
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from chatbot.search import SearchCache, extract_search_query  # noqa: E402,F401
@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from "react";
 import { Bars } from "react-loader-spinner";
 import { IMessages } from "../pages/Chatbot";
+import { sessionHeaders } from "../session";
 interface  AudioRecorderProps{
   setMessages: (obj:IMessages)=> void;
 }
@@ -138,6 +139,7 @@ const AudioRecorder: React.FC<AudioRecorderProps> = ({setMessages}) => {
         const response = await fetch("http://localhost:8000/continuous-response/", {
             method: "POST",
             body: formData,
+            headers: sessionHeaders(),
         });
         const data = await response.json();
         console.log("Audio uploaded successfully:", data);
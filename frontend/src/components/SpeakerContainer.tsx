@@ -3,6 +3,7 @@ import AudioRecorder from "./AudioRecorder";
 import React, { useState } from "react";
 import { IMessages } from "../pages/Chatbot";
 import CameraComponent from "./CameraComponent";
+import { sessionHeaders } from "../session";
 
 interface SpeakerContainerProps {
   changeTalking: () => void;
@@ -34,6 +35,7 @@ const SpeakerContainer: React.FC<SpeakerContainerProps> = ({
         body: formData,
         headers: {
           Accept: "application/json",
+          ...sessionHeaders(),
         },
       });
 
@@ -2,6 +2,7 @@ import axios from "axios";
 import { useEffect, useState } from "react";
 import MessageList from "../components/MessageList";
 import MessageInput from "../components/MessageInput";
+import { sessionHeaders } from "../session";
 import Spline from "@splinetool/react-spline";
 
 export interface IMessages {
@@ -21,7 +22,8 @@ const Chatbot = () => {
         "http://localhost/text-service/user/input",
         {
           text: message,
-        }
+        },
+        { headers: sessionHeaders() }
       );
 
       console.log(response);
@@ -0,0 +1,16 @@
+const SESSION_KEY = "session_id";
+
+// One conversation per browser: the backend keys chat history, memory and
+// emotion state by this id, so it must never be shared between users.
+export function getSessionId(): string {
+  let sessionId = localStorage.getItem(SESSION_KEY);
+  if (!sessionId) {
+    sessionId = crypto.randomUUID();
+    localStorage.setItem(SESSION_KEY, sessionId);
+  }
+  return sessionId;
+}
+
+export function sessionHeaders(): Record<string, string> {
+  return { "X-Session-ID": getSessionId() };
+}